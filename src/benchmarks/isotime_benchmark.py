@@ -0,0 +1,35 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+
+Compares resource_api.isotime parsers with the respective isodate functions.
+
+Usage: python benchmarks/isotime_benchmark.py [number of iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+CASES = [
+    ("parse_datetime", "2013-09-30T11:32:39"),
+    ("parse_datetime", "2013-09-30T11:32:39.984847"),
+    ("parse_datetime", "2013-09-30T11:32:39.984847+02:00"),
+    ("parse_date", "2013-09-30"),
+    ("parse_time", "11:32:39.984847Z")
+]
+
+
+def main(number):
+    setup = "import isodate; from resource_api import isotime"
+    print "%-16s %-34s %10s %10s %8s" % ("function", "value", "isodate", "isotime", "speedup")
+    for func, val in CASES:
+        slow = timeit.timeit("isodate.%s(%r)" % (func, val), setup, number=number)
+        fast = timeit.timeit("isotime.%s(%r)" % (func, val), setup, number=number)
+        print "%-16s %-34s %9.3fs %9.3fs %7.1fx" % (func, val, slow, fast, slow / fast)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,69 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+
+Compares request matching speed of WerkzeugRouter and DictRouter for a service with many resources and links.
+
+Usage: python benchmarks/router_benchmark.py [number of resources] [number of iterations]
+"""
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.test import create_environ
+
+from resource_api_http.http import WerkzeugRouter, DictRouter, _add_rules
+
+
+LINKS_PER_RESOURCE = 3
+
+
+def make_schema(resource_count):
+    schema = {}
+    for i in xrange(resource_count):
+        links = {}
+        for j in xrange(LINKS_PER_RESOURCE):
+            links["link%d" % j] = {"cardinality": "ONE" if j == 0 else "MANY"}
+        schema["namespace.Resource%d" % i] = {"links": links}
+    return schema
+
+
+def make_environs(resource_count, count=1000):
+    rnd = random.Random(0)
+    templates = [
+        ("GET", "/namespace.Resource%d"),
+        ("GET", "/namespace.Resource%d:count"),
+        ("PATCH", "/namespace.Resource%d/pk"),
+        ("GET", "/namespace.Resource%d/pk/link0/item:data"),
+        ("GET", "/namespace.Resource%d/pk/link1"),
+        ("GET", "/namespace.Resource%d/pk/link2/target:data")
+    ]
+    rval = []
+    for _ in xrange(count):
+        method, template = rnd.choice(templates)
+        rval.append(create_environ(template % rnd.randrange(resource_count), method=method))
+    return rval
+
+
+def main(resource_count, number):
+    schema = make_schema(resource_count)
+    environs = make_environs(resource_count)
+    print "%d resources, %d links, %d requests" % (resource_count, resource_count * LINKS_PER_RESOURCE,
+                                                   number * len(environs))
+    for router_class in [WerkzeugRouter, DictRouter]:
+        router = router_class()
+        _add_rules(router, None, schema)
+        router.build()
+
+        def run():
+            for environ in environs:
+                router.match(environ)
+
+        print "%-16s %9.3fs" % (router_class.__name__, timeit.timeit(run, number=number))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300, int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,207 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+"""
+from copy import deepcopy
+from collections import defaultdict
+
+from .interfaces import BaseInterface, Link
+
+
+class IdentityMap(object):
+    """ Holds results of DAL and authorization calls made through a single entry point.
+
+    Results are stored per (interface name, pk) pair and are dropped whenever the entry point changes the respective
+    resource or link.
+    """
+
+    def __init__(self):
+        self._values = defaultdict(dict)
+        self._wrappers = {}
+
+    def wrap(self, interface):
+        """ Returns a caching proxy for Resource or Link instance. Any other value is returned as is. """
+        if not isinstance(interface, BaseInterface):
+            return interface
+        name = interface.get_name()
+        if name not in self._wrappers:
+            if isinstance(interface, Link):
+                self._wrappers[name] = CachedLink(interface, self)
+            else:
+                self._wrappers[name] = CachedResource(interface, self)
+        return self._wrappers[name]
+
+    def has(self, key, method):
+        return key in self._values and method in self._values[key]
+
+    def get(self, key, method, compute):
+        values = self._values[key]
+        if method not in values:
+            values[method] = compute()
+        return values[method]
+
+    def set(self, key, method, value):
+        self._values[key][method] = value
+
+    def invalidate(self, key):
+        self._values.pop(key, None)
+
+
+class _CachedInterface(object):
+
+    def __init__(self, interface, identity_map):
+        self._interface = interface
+        self._identity_map = identity_map
+        self._name = interface.get_name()
+
+    def __getattr__(self, name):
+        return getattr(self._interface, name)
+
+    def __str__(self):
+        return str(self._interface)
+
+    def _get(self, pk, method, compute):
+        return self._identity_map.get((self._name, pk), method, compute)
+
+    def _get_many(self, pks, method, compute_many):
+        missing = [pk for pk in pks if not self._identity_map.has((self._name, pk), method)]
+        if missing:
+            for pk, value in zip(missing, compute_many(missing)):
+                self._identity_map.set((self._name, pk), method, value)
+        return [self._get(pk, method, None) for pk in pks]
+
+    def _invalidate(self, *pks):
+        for pk in pks:
+            self._identity_map.invalidate((self._name, pk))
+
+
+class _CachedLinks(object):
+
+    def __init__(self, links, identity_map):
+        self._links = links
+        self._identity_map = identity_map
+
+    def __getattr__(self, name):
+        return self._identity_map.wrap(getattr(self._links, name))
+
+
+class CachedResource(_CachedInterface):
+    """ Memoizes *exists*, *get_data* and *can_discover* results of a resource
+
+    *can_get_data* is not memoized because its result depends on the data being authorized, *get_data* results are
+    deep copies so that changes made by the caller do not leak into the cache.
+    """
+
+    def __init__(self, interface, identity_map):
+        super(CachedResource, self).__init__(interface, identity_map)
+        self.links = _CachedLinks(interface.links, identity_map)
+
+    def exists(self, user, pk):
+        return self._get(pk, "exists", lambda: self._interface.exists(user, pk))
+
+    def exists_many(self, user, pks):
+        return self._get_many(pks, "exists", lambda missing: self._interface.exists_many(user, missing))
+
+    def get_data(self, user, pk):
+        return deepcopy(self._get(pk, "get_data", lambda: self._interface.get_data(user, pk)))
+
+    def get_data_many(self, user, pks):
+        return map(deepcopy, self._get_many(pks, "get_data",
+                                            lambda missing: self._interface.get_data_many(user, missing)))
+
+    def can_discover(self, user, pk):
+        return self._get(pk, "can_discover", lambda: self._interface.can_discover(user, pk))
+
+    def can_discover_many(self, user, pks):
+        return self._get_many(pks, "can_discover",
+                              lambda missing: self._interface.can_discover_many(user, missing))
+
+    def create(self, user, pk, data):
+        rval = self._interface.create(user, pk, data)
+        self._invalidate(pk, rval)
+        return rval
+
+    def create_many(self, user, items):
+        rval = self._interface.create_many(user, items)
+        self._invalidate(*rval)
+        return rval
+
+    def update(self, user, pk, data):
+        rval = self._interface.update(user, pk, data)
+        self._invalidate(pk)
+        return rval
+
+    def update_many(self, user, pks, data):
+        rval = self._interface.update_many(user, pks, data)
+        self._invalidate(*pks)
+        return rval
+
+    def delete(self, user, pk):
+        rval = self._interface.delete(user, pk)
+        self._invalidate(pk)
+        return rval
+
+    def delete_many(self, user, pks):
+        rval = self._interface.delete_many(user, pks)
+        self._invalidate(*pks)
+        return rval
+
+
+class CachedLink(_CachedInterface):
+    """ Memoizes *exists*, *get_data* and *can_discover* results of a link the same way as CachedResource does """
+
+    @property
+    def related_link(self):
+        return self._identity_map.wrap(self._interface.related_link)
+
+    def exists(self, user, pk, rel_pk):
+        return self._get(pk, ("exists", rel_pk), lambda: self._interface.exists(user, pk, rel_pk))
+
+    def exists_many(self, user, items):
+        missing = [(pk, rel_pk) for pk, rel_pk in items
+                   if not self._identity_map.has((self._name, pk), ("exists", rel_pk))]
+        if missing:
+            for (pk, rel_pk), value in zip(missing, self._interface.exists_many(user, missing)):
+                self._identity_map.set((self._name, pk), ("exists", rel_pk), value)
+        return [self._get(pk, ("exists", rel_pk), None) for pk, rel_pk in items]
+
+    def get_data(self, user, pk, rel_pk):
+        return deepcopy(self._get(pk, ("get_data", rel_pk), lambda: self._interface.get_data(user, pk, rel_pk)))
+
+    def can_discover(self, user, pk, rel_pk):
+        return self._get(pk, ("can_discover", rel_pk), lambda: self._interface.can_discover(user, pk, rel_pk))
+
+    def create(self, user, pk, rel_pk, data=None):
+        rval = self._interface.create(user, pk, rel_pk, data)
+        self._invalidate(pk)
+        return rval
+
+    def create_many(self, user, items):
+        rval = self._interface.create_many(user, items)
+        self._invalidate(*set(pk for pk, _, _ in items))
+        return rval
+
+    def update(self, user, pk, rel_pk, data):
+        rval = self._interface.update(user, pk, rel_pk, data)
+        self._invalidate(pk)
+        return rval
+
+    def delete(self, user, pk, rel_pk):
+        rval = self._interface.delete(user, pk, rel_pk)
+        self._invalidate(pk)
+        return rval
+
+    def replace_target(self, user, pk, old_rel_pk, new_rel_pk, data=None):
+        rval = self._interface.replace_target(user, pk, old_rel_pk, new_rel_pk, data)
+        self._invalidate(pk)
+        return rval
+
+    def delete_reverse_many(self, user, pks, rel_pk):
+        rval = self._interface.delete_reverse_many(user, pks, rel_pk)
+        self._invalidate(*pks)
+        return rval
+
+    def delete_many(self, user, items):
+        rval = self._interface.delete_many(user, items)
+        self._invalidate(*set(pk for pk, _ in items))
+        return rval
@@ -4,10 +4,12 @@ See LICENSE for details
 """
 import inspect
 
+from collections import OrderedDict
+from itertools import islice
 from abc import ABCMeta, abstractmethod, abstractproperty
 
 from .schema import Schema
-from .errors import ResourceDeclarationError
+from .errors import ResourceDeclarationError, ValidationError, MultipleFound
 
 
 class BaseMetaClass(ABCMeta):
@@ -18,6 +20,10 @@ class BaseMetaClass(ABCMeta):
         class ResourceSchema(cls.Schema, Schema):
             pass
 
+        # Readonly fields cannot be required and have default values
+        for field_name in ResourceSchema.find_fields(readonly=True):
+            ResourceSchema._make_optional(field_name)
+
         cls.Schema = ResourceSchema
 
         class QuerySchema(cls.QuerySchema, Schema):
@@ -57,13 +63,6 @@ class BaseInterface(object):
         self.meta = self.Meta()
         self.context = context
 
-        # Readonly fields cannot be required and have default values
-        for field_name in self.schema.find_fields(readonly=True):
-            self.schema._required_fields.discard(field_name)
-            self.schema._defaults.pop(field_name, None)
-            self.schema.fields[field_name].default = None
-            self.schema.fields[field_name].required = False
-
     def get_schema(self):
         meta = {}
         for key in dir(self.Meta):
@@ -235,26 +234,112 @@ class Resource(BaseInterface):
     def exists(self, user, pk):
         """ Returns True if the resource exists """
 
+    def exists_many(self, user, pks):
+        """ Returns a list of booleans - one *exists* result per PK """
+        return [self.exists(user, pk) for pk in pks]
+
     @abstractmethod
     def create(self, user, pk, data):
         """ Creates a new instance"""
 
+    def create_many(self, user, items):
+        """ Creates several instances at once
+
+        items (list)
+            (pk, data) tuples, pk is None if it must be generated by DAL
+        @return
+            list with PKs of created instances in the same order as *items*
+
+        Override it to store the data via a single DAL call. By default *create* is called for every item.
+        """
+        rval = []
+        for pk, data in items:
+            created_pk = self.create(user, pk, data)
+            rval.append(created_pk if pk is None else pk)
+        return rval
+
     @abstractmethod
     def update(self, user, pk, data):
         """ Updates specified fields of a given instance """
 
+    def update_many(self, user, pks, data):
+        """ Updates specified fields of several instances with the same data
+
+        Override it to update the items via a single DAL call. By default *update* is called for every PK.
+        """
+        for pk in pks:
+            self.update(user, pk, data)
+
     @abstractmethod
     def get_data(self, user, pk):
         """ Returns fields of the resource """
 
+    def get_data_many(self, user, pks):
+        """ Returns a list with fields of several resources in the same order as *pks*
+
+        Override it to fetch the data via a single DAL call. By default *get_data* is called for every PK.
+        """
+        return [self.get_data(user, pk) for pk in pks]
+
+    def get_partial_data(self, user, pk, fields):
+        """ Returns fields of the resource when only some of them are needed
+
+        fields (frozenset)
+            names of the fields requested by the client
+
+        Override it to fetch fewer fields from the database. The result is passed to *can_get_data* as is and trimmed to
+        *fields* afterwards - so it has to include the fields *can_get_data* relies on. By default *get_data* is called.
+        """
+        return self.get_data(user, pk)
+
+    def get_partial_data_many(self, user, pks, fields):
+        """ Returns a list with *get_partial_data* results for several resources in the same order as *pks*
+
+        By default the data is fetched via *get_data_many*.
+        """
+        return self.get_data_many(user, pks)
+
     @abstractmethod
     def delete(self, user, pk):
         """ Removes the resource """
 
+    def delete_many(self, user, pks):
+        """ Removes several resources
+
+        Override it to remove the items via a single DAL call. By default *delete* is called for every PK.
+        """
+        for pk in pks:
+            self.delete(user, pk)
+
     @abstractmethod
     def get_uris(self, user, params=None):
         """ Returns an iterable over primary keys """
 
+    def get_uris_page(self, user, params=None, limit=None, offset=0, cursor=None):
+        """ Returns a tuple: a list with at most *limit* primary keys and a cursor pointing to the next page or None if
+        there are no more pages
+
+        limit (int|None)
+            maximum amount of primary keys to return, None means all of them
+        offset (int)
+            amount of primary keys to skip
+        cursor (string|None)
+            value returned for the previous page, when defined *offset* is ignored
+
+        Override it to make the paging happen inside DAL. By default the result of *get_uris* is sliced and stringified
+        offsets are used as cursors.
+        """
+        if cursor is not None:
+            try:
+                offset = int(cursor)
+            except ValueError:
+                raise ValidationError("Invalid cursor %r" % cursor)
+        stop = None if limit is None else offset + limit + 1
+        pks = list(islice(self.get_uris(user, params), offset, stop))
+        if limit is not None and len(pks) > limit:
+            return pks[:limit], str(offset + limit)
+        return pks, None
+
     @abstractmethod
     def get_count(self, user, params=None):
         """ Returns total amount of items that fit filtering criterias """
@@ -269,6 +354,14 @@ class Resource(BaseInterface):
         """ Returns False if user is not allowed to know about resoure's existence """
         return True
 
+    def can_get_data_many(self, user, pks, data):
+        """ Returns a list of booleans - one *can_get_data* result per PK and respective item of *data* list """
+        return [self.can_get_data(user, pk, item_data) for pk, item_data in zip(pks, data)]
+
+    def can_discover_many(self, user, pks):
+        """ Returns a list of booleans - one *can_discover* result per PK """
+        return [self.can_discover(user, pk) for pk in pks]
+
     def can_get_uris(self, user):
         """ Returns True if user is allowed to list the items in the collection or get their count """
         return True
@@ -281,10 +374,22 @@ class Resource(BaseInterface):
         """ Returns True if user is allowed to create resource with certain data """
         return True
 
+    def can_create_many(self, user, data):
+        """ Returns a list of booleans - one *can_create* result per item of *data* list """
+        return [self.can_create(user, item_data) for item_data in data]
+
+    def can_update_many(self, user, pks, data):
+        """ Returns a list of booleans - one *can_update* result per PK """
+        return [self.can_update(user, pk, data) for pk in pks]
+
     def can_delete(self, user, pk):
         """ Returns True if user is allowed to delete the resource """
         return True
 
+    def can_delete_many(self, user, pks):
+        """ Returns a list of booleans - one *can_delete* result per PK """
+        return [self.can_delete(user, pk) for pk in pks]
+
 
 class Link(BaseInterface):
     """ Represents a relationship between two resources that needs to be exposed via public interface
@@ -317,13 +422,14 @@ class Link(BaseInterface):
     one_way = False
     changeable = True
     readonly = False
+    bulk_delete = False
     related_name = target = None
 
     def __init__(self, context):
         super(Link, self).__init__(context)
         cls = self.__class__
 
-        for name in ["master", "required", "one_way", "changeable"]:
+        for name in ["master", "required", "one_way", "changeable", "bulk_delete"]:
             if not isinstance(getattr(cls, name), bool):
                 raise ResourceDeclarationError(cls, "%s must be boolean" % name)
 
@@ -383,14 +489,46 @@ class Link(BaseInterface):
     def exists(self, user, pk, rel_pk):
         """ Returns True if the link exists (is not nullable) """
 
+    def exists_many(self, user, items):
+        """ Returns a list of booleans - one *exists* result per (pk, rel_pk) tuple of *items*
+
+        Override it to check the links via a single DAL call. By default *exists* is called for every item.
+        """
+        return [self.exists(user, pk, rel_pk) for pk, rel_pk in items]
+
     @abstractmethod
     def get_data(self, user, pk, rel_pk):
         """ Returns link data """
 
+    def get_data_many(self, user, pk, rel_pks):
+        """ Returns a list with data of several links of the same resource in the same order as *rel_pks*
+
+        Override it to fetch the data via a single DAL call. By default *get_data* is called for every target PK.
+        """
+        return [self.get_data(user, pk, rel_pk) for rel_pk in rel_pks]
+
+    def get_data_reverse_many(self, user, pks, rel_pk):
+        """ Returns a list with data of the links of several resources to the same target in the same order as *pks*
+
+        Override it to fetch the data via a single DAL call. By default *get_data* is called for every PK.
+        """
+        return [self.get_data(user, pk, rel_pk) for pk in pks]
+
     @abstractmethod
     def create(self, user, pk, rel_pk, data=None):
         """ Creates a new link with optional extra data """
 
+    def create_many(self, user, items):
+        """ Creates several links at once
+
+        items (list)
+            (pk, rel_pk, data) tuples, the links may belong to different resources
+
+        Override it to store the links via a single DAL call. By default *create* is called for every item.
+        """
+        for pk, rel_pk, data in items:
+            self.create(user, pk, rel_pk, data)
+
     @abstractmethod
     def update(self, user, pk, rel_pk, data):
         """ Updates exisiting link with specified data """
@@ -399,10 +537,56 @@ class Link(BaseInterface):
     def delete(self, user, pk, rel_pk):
         """ Removes the link. If rel_pk is None - removes all links """
 
+    def delete_reverse_many(self, user, pks, rel_pk):
+        """ Removes the links of several resources to the same target
+
+        Override it to remove the links via a single DAL call. By default *delete* is called for every PK.
+        """
+        for pk in pks:
+            self.delete(user, pk, rel_pk)
+
+    def delete_many(self, user, items):
+        """ Removes several links at once
+
+        items (list)
+            (pk, rel_pk) tuples, the links may belong to different resources
+
+        Override it to remove the links via a single DAL call. By default *delete* is called for every item.
+        """
+        for pk, rel_pk in items:
+            self.delete(user, pk, rel_pk)
+
     @abstractmethod
     def get_uris(self, user, pk, params=None):
         """ Returns an iterable over target primary keys """
 
+    def get_target(self, user, pk):
+        """ Returns PK of the only target of a link with cardinality ONE or None if there is no target
+
+        Override it to avoid building a list of targets. By default *get_uris* is used.
+        """
+        rel_pks = list(self.get_uris(user, pk))
+        if len(rel_pks) > 1:
+            raise MultipleFound("Several instances of a link with cardinality ONE were found")
+        return rel_pks[0] if rel_pks else None
+
+    def replace_target(self, user, pk, old_rel_pk, new_rel_pk, data=None):
+        """ Replaces the target of a link with cardinality ONE, data is None for slave links
+
+        Override it to replace the target atomically via a single DAL call. By default *delete* and *create* are
+        called.
+        """
+        self.delete(user, pk, old_rel_pk)
+        self.create(user, pk, new_rel_pk, data)
+
+    def get_uris_many(self, user, pks, params=None):
+        """ Returns a list with one iterable over target primary keys per item of *pks*
+
+        Override it to fetch the links of several resources via a single DAL call. By default *get_uris* is called for
+        every PK.
+        """
+        return [self.get_uris(user, pk, params) for pk in pks]
+
     @abstractmethod
     def get_count(self, user, pk, params=None):
         """ Returns total amount of items that fit filtering criterias """
@@ -417,10 +601,41 @@ class Link(BaseInterface):
         """ Returns False if user is not allowed to know about resoure's existence """
         return True
 
+    def can_get_data_many(self, user, pk, rel_pks, data):
+        """ Returns a list of booleans - one *can_get_data* result per target PK and respective item of *data* list """
+        return [self.can_get_data(user, pk, rel_pk, item_data) for rel_pk, item_data in zip(rel_pks, data)]
+
+    def can_discover_many(self, user, pk, rel_pks):
+        """ Returns a list of booleans - one *can_discover* result per target PK """
+        return [self.can_discover(user, pk, rel_pk) for rel_pk in rel_pks]
+
+    def can_discover_pairs(self, user, items):
+        """ Returns a list of booleans - one *can_discover* result per (pk, rel_pk) tuple of *items*
+
+        Override it to authorize the links of several resources via a single call. By default *can_discover_many* is
+        called for every source PK.
+        """
+        rel_pks = OrderedDict()
+        for pk, rel_pk in items:
+            rel_pks.setdefault(pk, []).append(rel_pk)
+        allowed = {}
+        for pk, pk_rel_pks in rel_pks.iteritems():
+            for rel_pk, ok in zip(pk_rel_pks, self.can_discover_many(user, pk, pk_rel_pks)):
+                allowed[(pk, rel_pk)] = ok
+        return [allowed[item] for item in items]
+
     def can_get_uris(self, user, pk):
         """ Returns True if user is allowed to list the items in the collection or get their count """
         return True
 
+    def can_get_uris_many(self, user, pks):
+        """ Returns a list of booleans - one *can_get_uris* result per PK
+
+        Override it to authorize the collections of several resources via a single call. By default *can_get_uris* is
+        called for every PK.
+        """
+        return [self.can_get_uris(user, pk) for pk in pks]
+
     def can_update(self, user, pk, rel_pk, data):
         """ Returns True if user is allowed to update the resource """
         return True
@@ -429,6 +644,10 @@ class Link(BaseInterface):
         """ Returns True if user is allowed to create resource with certain data """
         return True
 
+    def can_create_many(self, user, items):
+        """ Returns a list of booleans - one *can_create* result per (pk, rel_pk, data) tuple of *items* """
+        return [self.can_create(user, pk, rel_pk, data) for pk, rel_pk, data in items]
+
     def can_delete(self, user, pk, rel_pk):
         """ Returns True if user is allowed to delete the resource """
         return True
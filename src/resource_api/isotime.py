@@ -0,0 +1,81 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+
+Parsers for ISO 8601 strings in the shapes produced by *isoformat* methods:
+
+    - YYYY-MM-DD
+    - hh:mm:ss[.ffffff][Z|+hh:mm|-hh:mm]
+    - YYYY-MM-DDThh:mm:ss[.ffffff][Z|+hh:mm|-hh:mm]
+
+Such strings are parsed by slicing. Any other ISO 8601 form is passed to isodate. The results are the same as the ones
+of respective isodate functions.
+"""
+import datetime
+
+import isodate
+from isodate.isotzinfo import build_tzinfo
+
+
+def _digits(val, start, end):
+    part = val[start:end]
+    if len(part) != end - start or not part.isdigit():
+        raise ValueError(val)
+    return int(part)
+
+
+def _parse_date(val):
+    if len(val) != 10 or val[4] != "-" or val[7] != "-":
+        raise ValueError(val)
+    return datetime.date(_digits(val, 0, 4), _digits(val, 5, 7), _digits(val, 8, 10))
+
+
+def _parse_tzinfo(val):
+    if not val:
+        return None
+    if val == "Z":
+        return build_tzinfo(val)
+    if len(val) != 6 or val[0] not in "+-" or val[3] != ":":
+        raise ValueError(val)
+    return build_tzinfo(val, val[0], _digits(val, 1, 3), _digits(val, 4, 6))
+
+
+def _parse_time(val):
+    if len(val) < 8 or val[2] != ":" or val[5] != ":":
+        raise ValueError(val)
+    hour, minute, second = _digits(val, 0, 2), _digits(val, 3, 5), _digits(val, 6, 8)
+    microsecond, pos = 0, 8
+    if val[pos:pos + 1] == ".":
+        end = pos + 1
+        while val[end:end + 1].isdigit():
+            end += 1
+        if not 1 < end - pos <= 7:
+            raise ValueError(val)
+        microsecond, pos = int(val[pos + 1:end].ljust(6, "0")), end
+    return datetime.time(hour, minute, second, microsecond, _parse_tzinfo(val[pos:]))
+
+
+def parse_date(val):
+    """ Parses YYYY-MM-DD string into a date object """
+    try:
+        return _parse_date(val)
+    except ValueError:
+        return isodate.parse_date(val)
+
+
+def parse_time(val):
+    """ Parses hh:mm:ss[.ffffff][Z|+hh:mm|-hh:mm] string into a time object """
+    try:
+        return _parse_time(val)
+    except ValueError:
+        return isodate.parse_time(val)
+
+
+def parse_datetime(val):
+    """ Parses YYYY-MM-DDThh:mm:ss[.ffffff][Z|+hh:mm|-hh:mm] string into a datetime object """
+    try:
+        if val[10:11] != "T":
+            raise ValueError(val)
+        return datetime.datetime.combine(_parse_date(val[:10]), _parse_time(val[11:]))
+    except ValueError:
+        return isodate.parse_datetime(val)
@@ -2,8 +2,11 @@
 Copyright (c) 2014-2015 F-Secure
 See LICENSE for details
 """
+from collections import deque
+from itertools import islice
+
 from .errors import(
-    DoesNotExist, Forbidden, ValidationError, MultipleFound, FrameworkError, AuthorizationError, DataConflictError)
+    DoesNotExist, Forbidden, ValidationError, FrameworkError, AuthorizationError, DataConflictError)
 from .interfaces import Link as BaseLink
 
 
@@ -27,15 +30,9 @@ class LinkHolder(object):
         self._pk = pk
 
     def __getattr__(self, name):
-        if not hasattr(self._res.links, name):
-            raise DoesNotExist("Link %r is not defined" % name)
-        forward_link_instance = getattr(self._res.links, name)
-        target_collection = self._entry_point.get_resource_by_name(forward_link_instance.target)
-        if forward_link_instance.cardinality == BaseLink.cardinalities.ONE:
-            return LinkToOne(target_collection, forward_link_instance, forward_link_instance.related_link, self._pk)
-        else:
-            return RootLinkCollection(target_collection, forward_link_instance, forward_link_instance.related_link,
-                                      self._pk)
+        link_class, target_collection, forward_link_instance, backward_link_instance = \
+            self._entry_point._get_link(self._res, name)
+        return link_class(target_collection, forward_link_instance, backward_link_instance, self._pk)
 
     def _set_pk(self, pk):
         self._pk = pk
@@ -45,14 +42,27 @@ class LinkHolder(object):
         for name, _ in self._res.iter_links():
             getattr(self, name)._clear()
 
-    def _validate(self, links_data):
-        required_links = set([link_name for link_name, link in self._res.iter_links() if link.required])
+    @classmethod
+    def _clear_many(cls, entry_point, resource_instance, pks):
+        """ Removes all the outgoing links of several resources with a constant number of DAL calls per link type """
+        for name, _ in resource_instance.iter_links():
+            link_class, target_collection, forward_link_instance, backward_link_instance = \
+                entry_point._get_link(resource_instance, name)
+            link_class._clear_many(target_collection, forward_link_instance, backward_link_instance, pks)
+
+    @classmethod
+    def _validate_structure(cls, resource_instance, links_data):
+        required_links = set([link_name for link_name, link in resource_instance.iter_links() if link.required])
         links_data = links_data or {}
         if not isinstance(links_data, dict):
             raise ValidationError("Links' data must be a dict")
         missing_fields = list(required_links.difference(set(links_data.keys())))
         if missing_fields:
             raise ValidationError("Required links are missing: %s" % ", ".join(missing_fields))
+        return links_data
+
+    def _validate(self, links_data):
+        links_data = self._validate_structure(self._res, links_data)
         valid_links_data = {}
         for name, link_data in links_data.iteritems():
             try:
@@ -65,6 +75,58 @@ class LinkHolder(object):
         for name, link_data in links_data.iteritems():
             getattr(self, name)._set(link_data)
 
+    @classmethod
+    def _validate_many(cls, entry_point, resource_instance, links_data):
+        """ Does the same checks as *_validate* for the links of several new resources with a constant number of DAL
+        calls per link type
+
+        Returns a list with one entry per item of *links_data*: either validated links' data or a ValidationError.
+        """
+        rval = [None] * len(links_data)
+        by_name = {}
+        for index, item in enumerate(links_data):
+            try:
+                item = cls._validate_structure(resource_instance, item)
+            except ValidationError, e:
+                rval[index] = e
+                continue
+            rval[index] = {}
+            for name, link_data in item.iteritems():
+                by_name.setdefault(name, []).append((index, link_data))
+        for name in sorted(by_name):
+            items = by_name[name]
+            try:
+                link_class, target_collection, forward_link_instance, backward_link_instance = \
+                    entry_point._get_link(resource_instance, name)
+                lnk = link_class(target_collection, forward_link_instance, backward_link_instance, None)
+                results = lnk._validate_records([link_data for _, link_data in items])
+            except FrameworkError, msg:
+                results = [msg] * len(items)
+            for (index, _), result in zip(items, results):
+                if isinstance(rval[index], FrameworkError):
+                    continue
+                if isinstance(result, FrameworkError):
+                    rval[index] = ValidationError("@Link %s: %s" % (name, result))
+                else:
+                    rval[index][name] = result
+        return rval
+
+    @classmethod
+    def _set_many(cls, entry_point, resource_instance, items):
+        """ Stores validated links of several resources with a constant number of DAL calls per link type
+
+        items (list)
+            (pk, valid links' data) tuples
+        """
+        by_name = {}
+        for pk, links_data in items:
+            for name, link_data in links_data.iteritems():
+                by_name.setdefault(name, []).append((pk, link_data))
+        for name, records in by_name.iteritems():
+            link_class, target_collection, forward_link_instance, backward_link_instance = \
+                entry_point._get_link(resource_instance, name)
+            link_class(target_collection, forward_link_instance, backward_link_instance, None)._set_records(records)
+
 
 class Link(object):
 
@@ -84,6 +146,142 @@ class Link(object):
         if not forward_link_instance.one_way and backward_link_instance.readonly:
             raise Forbidden("%s (backward link is readonly)" % msg)
 
+    def _clear_all(self):
+        """ Removes all the links of the source resource with a constant number of DAL calls """
+        user = self._entry_point.user
+        forward, backward = self._forward_link_instance, self._backward_link_instance
+        target_pks = list(forward.get_uris(user, self._source_pk))
+        if not target_pks:
+            return
+        if backward and backward.required and backward.cardinality == BaseLink.cardinalities.ONE:
+            self._target_collection._res.delete_many(user, target_pks)
+        forward.delete(user, self._source_pk, None)
+        if backward:
+            backward.delete_reverse_many(user, target_pks, self._source_pk)
+
+    @classmethod
+    def _clear_many(cls, target_collection, forward_link_instance, backward_link_instance, pks):
+        """ Removes the links of several source resources with a constant number of DAL calls """
+        user = target_collection._entry_point.user
+        items = [(pk, target_pk) for pk, target_pks in zip(pks, forward_link_instance.get_uris_many(user, pks))
+                 for target_pk in target_pks]
+        if not items:
+            return
+        if backward_link_instance and backward_link_instance.required and \
+           backward_link_instance.cardinality == BaseLink.cardinalities.ONE:
+            target_pks, seen = [], set()
+            for _, target_pk in items:
+                if target_pk not in seen:
+                    seen.add(target_pk)
+                    target_pks.append(target_pk)
+            target_collection._res.delete_many(user, target_pks)
+        forward_link_instance.delete_many(user, items)
+        if backward_link_instance:
+            backward_link_instance.delete_many(user, [(target_pk, pk) for pk, target_pk in items])
+
+    def _master_pks(self, target_pk, source_pk=None):
+        """ Returns (pk, rel_pk) tuple of the link from the perspective of the master link instance """
+        if source_pk is None:
+            source_pk = self._source_pk
+        if self._forward_link_instance.master:
+            return source_pk, target_pk
+        else:
+            return target_pk, source_pk
+
+    def _validate_many(self, links_data, groups=None, validate_conflict=True):
+        """ Does the same checks as *LinkInstance._validate* for several links using bulk DAL calls
+
+        groups (list = None)
+            one key per item of *links_data*, a link is a duplicate only of the links with the same key
+
+        Returns a list with one entry per item of *links_data*: either validated link data or an error
+        (FrameworkError instance). Errors that concern the link as a whole are raised.
+        """
+        LinkInstance._validate_readonly(self._forward_link_instance, self._backward_link_instance)
+        LinkInstance._validate_direction(self._forward_link_instance, self._backward_link_instance)
+
+        user = self._entry_point.user
+        master = self._forward_link_instance if self._forward_link_instance.master else self._backward_link_instance
+        groups = groups or [None] * len(links_data)
+        rval = [None] * len(links_data)
+
+        valid = []
+        for index, link_data in enumerate(links_data):
+            if not isinstance(link_data, dict):
+                rval[index] = ValidationError("Link data must be a dict")
+            elif "@target" not in link_data:
+                rval[index] = ValidationError("Target is not defined")
+            else:
+                link_data = dict(link_data)
+                valid.append((index, link_data.pop("@target"), link_data))
+
+        targets = self._target_collection._get_many([target_pk for _, target_pk, _ in valid])
+        found = []
+        for item, target in zip(valid, targets):
+            if isinstance(target, DoesNotExist):
+                rval[item[0]] = ValidationError("Target: %s" % target)
+            else:
+                found.append(item)
+
+        items = [self._master_pks(target_pk) + (link_data,) for _, target_pk, link_data in found]
+        mask = master.can_create_many(user, items) if items else []
+        allowed = []
+        for item, ok in zip(found, mask):
+            if ok:
+                allowed.append(item)
+            else:
+                rval[item[0]] = AuthorizationError("Linking is not allowed")
+
+        if validate_conflict:
+            mask = master.exists_many(user, [self._master_pks(target_pk) for _, target_pk, _ in allowed]) \
+                if allowed else []
+            new, seen = [], set()
+            for item, exists in zip(allowed, mask):
+                key = (groups[item[0]], item[1])
+                if exists or key in seen:
+                    rval[item[0]] = DataConflictError("Link already exists")
+                else:
+                    seen.add(key)
+                    new.append(item)
+        else:
+            new = allowed
+
+        rows, errors = master.schema._deserialize_many([link_data for _, _, link_data in new])
+        readonly = master.schema.find_fields(readonly=True)
+        for position, ((index, target_pk, _), data) in enumerate(zip(new, rows)):
+            if position in errors:
+                rval[index] = ValidationError(errors[position])
+                continue
+            intersection = readonly.intersection(set(data.keys()))
+            if intersection:
+                rval[index] = ValidationError("Readonly fields can not be set: %s" % ", ".join(intersection))
+                continue
+            data["@target"] = target_pk
+            rval[index] = data
+        return rval
+
+    def _create_many(self, links_data, source_pks=None):
+        """ Stores validated links via bulk DAL calls - link data is stored only in the master link
+
+        source_pks (list = None)
+            one source PK per item of *links_data*, by default all the links belong to the source of this link
+        """
+        user = self._entry_point.user
+        source_pks = source_pks or [self._source_pk] * len(links_data)
+        target_pks = [link_data.pop("@target") for link_data in links_data]
+        items = [self._master_pks(target_pk, source_pk) + (link_data,)
+                 for source_pk, target_pk, link_data in zip(source_pks, target_pks, links_data)]
+        if self._forward_link_instance.master:
+            master, slave = self._forward_link_instance, self._backward_link_instance
+        else:
+            master, slave = self._backward_link_instance, self._forward_link_instance
+        if items:
+            master.create_many(user, items)
+            if slave:
+                slave.create_many(user, [(rel_pk, pk, None) for pk, rel_pk, _ in items])
+        return [LinkInstance(self._target_collection, self._forward_link_instance, self._backward_link_instance,
+                             source_pk, target_pk) for source_pk, target_pk in zip(source_pks, target_pks)]
+
     def _validate_changability(self, operation, msg=None):
         self._validate_readonly(self._forward_link_instance, self._backward_link_instance)
         msg = msg or "It is not allowed to %s unchangeable links" % operation
@@ -101,17 +299,14 @@ class LinkInstance(Link):
     """
 
     def __init__(self, target_collection, forward_link_instance, backward_link_instance,
-                 source_pk, target_pk):
+                 source_pk, target_pk, data=None):
         super(LinkInstance, self).__init__(target_collection, forward_link_instance, backward_link_instance,
                                            source_pk)
         self._target_pk = target_pk
+        self._data = data
 
     @classmethod
-    def _validate(cls, target_collection, forward_link_instance, backward_link_instance, source_pk, link_data,
-                  validate_conflict=True):
-
-        cls._validate_readonly(forward_link_instance, backward_link_instance)
-
+    def _validate_direction(cls, forward_link_instance, backward_link_instance):
         if backward_link_instance and backward_link_instance.cardinality == BaseLink.cardinalities.ONE and \
            forward_link_instance.cardinality == BaseLink.cardinalities.MANY:
             # NOTE: the reason why it is prohibitied is because it is unclear what to do if the item is added
@@ -119,6 +314,13 @@ class LinkInstance(Link):
             raise Forbidden("It is forbiddened to create one to many links. Try creating from another end of the "
                             "relationship")
 
+    @classmethod
+    def _validate(cls, target_collection, forward_link_instance, backward_link_instance, source_pk, link_data,
+                  validate_conflict=True):
+
+        cls._validate_readonly(forward_link_instance, backward_link_instance)
+        cls._validate_direction(forward_link_instance, backward_link_instance)
+
         if not isinstance(link_data, dict):
             raise ValidationError("Link data must be a dict")
         if "@target" not in link_data:
@@ -174,6 +376,7 @@ class LinkInstance(Link):
             do(self._backward_link_instance, self._forward_link_instance, self._target_pk, self._source_pk)
 
     def _delete(self):
+        self._data = None
         self._forward_link_instance.delete(self._entry_point.user, self._source_pk, self._target_pk)
         if self._backward_link_instance:
             self._backward_link_instance.delete(self._entry_point.user, self._target_pk, self._source_pk)
@@ -197,6 +400,9 @@ class LinkInstance(Link):
         {"grade": 3}
         """
 
+        if self._data is not None:
+            return self._data
+
         # we need to fetch data from the master link
         # we need to perform authorization against the master link
 
@@ -220,6 +426,10 @@ class LinkInstance(Link):
         DoesNotExist: ...
         """
 
+        self._validate_delete()
+        self._delete()
+
+    def _validate_delete(self):
         self._validate_changability("delete")
 
         forward_link_required = self._forward_link_instance.required and \
@@ -245,8 +455,6 @@ class LinkInstance(Link):
         else:
             do(self._backward_link_instance, self._target_pk, self._source_pk)
 
-        self._delete()
-
     def update(self, data):
         """ Changes specified fields of the link
 
@@ -269,6 +477,7 @@ class LinkInstance(Link):
             inst.update(self._entry_point.user, source_pk, target_pk, validated)
 
         self._validate_changability("update")
+        self._data = None
 
         if self._forward_link_instance.master:
             do(self._forward_link_instance, self._source_pk, self._target_pk)
@@ -286,21 +495,30 @@ class LinkToOne(Link):
     """ Represents a relationship with cardinality ONE """
 
     def _get_item(self):
-        pks = self._forward_link_instance.get_uris(self._entry_point.user, self._source_pk)
-        if len(pks) == 1:
-            rel_pk = pks[0]
-            if not self._forward_link_instance.can_discover(self._entry_point.user, self._source_pk, rel_pk):
-                return None
-            if not self._target_collection._res.can_discover(self._entry_point.user, rel_pk):
-                return None
-            return LinkInstance(self._target_collection, self._forward_link_instance, self._backward_link_instance,
-                                self._source_pk, rel_pk)
-        elif len(pks) == 0:
+        rel_pk = self._forward_link_instance.get_target(self._entry_point.user, self._source_pk)
+        if rel_pk is None:
             return None
-        else:
-            raise MultipleFound("Several instances of a link with cardinality ONE were found")
+        if not self._forward_link_instance.can_discover(self._entry_point.user, self._source_pk, rel_pk):
+            return None
+        if not self._target_collection._res.can_discover(self._entry_point.user, rel_pk):
+            return None
+        return LinkInstance(self._target_collection, self._forward_link_instance, self._backward_link_instance,
+                            self._source_pk, rel_pk)
+
+    def _replace(self, the_item, link_data):
+        """ Points the link to a new target - the forward side is changed via a single *replace_target* call """
+        user = self._entry_point.user
+        forward, backward = self._forward_link_instance, self._backward_link_instance
+        old_target_pk, target_pk = the_item._target_pk, link_data.pop("@target")
+        the_item._data = None
+        forward.replace_target(user, self._source_pk, old_target_pk, target_pk, link_data if forward.master else None)
+        if backward:
+            backward.delete(user, old_target_pk, self._source_pk)
+            backward.create(user, target_pk, self._source_pk, None if forward.master else link_data)
 
     def _clear(self):
+        if self._forward_link_instance.bulk_delete:
+            return self._clear_all()
         the_item = self._get_item()
         if the_item is not None:
             if self._backward_link_instance.required and \
@@ -316,6 +534,14 @@ class LinkToOne(Link):
         LinkInstance._create(self._target_collection, self._forward_link_instance, self._backward_link_instance,
                              self._source_pk, data)
 
+    def _validate_records(self, records):
+        """ Does the same checks as *_validate* for the link data of several new resources using bulk DAL calls """
+        return self._validate_many(records, validate_conflict=False)
+
+    def _set_records(self, records):
+        """ Stores validated (source PK, link data) tuples of several resources using bulk DAL calls """
+        self._create_many([link_data for _, link_data in records], [pk for pk, _ in records])
+
     @property
     def item(self):
         """
@@ -345,9 +571,11 @@ class LinkToOne(Link):
         valid_data = self._validate(data)
         the_item = self._get_item()
         self._validate_changability("set")
-        if the_item is not None:
-            the_item.delete()
-        self._set(valid_data)
+        if the_item is None:
+            self._set(valid_data)
+        else:
+            the_item._validate_delete()
+            self._replace(the_item, valid_data)
 
 
 class LinkCollection(Link):
@@ -365,21 +593,38 @@ class LinkCollection(Link):
     indexable entity the collection elements can be accessed by index as well:
 
     >>> link = student_courses[15]
+
+    While iterating, authorization checks are done for chunks of *chunk_size* links at once via
+    :meth:`Link.can_discover_many <resource_api.interfaces.Link.can_discover_many>` and
+    :meth:`Resource.can_discover_many <resource_api.interfaces.Resource.can_discover_many>`.
     """
 
+    chunk_size = 100
+
     def __init__(self, target_collection, forward_link_instance, backward_link_instance, source_pk, params=None):
         super(LinkCollection, self).__init__(target_collection, forward_link_instance, backward_link_instance,
                                              source_pk)
         self._params = params or {}
         self._items = self._iter_items = None
+        self._chunk = deque()
 
     def _get(self, target_pk):
-        if not self._forward_link_instance.can_discover(self._entry_point.user, self._source_pk, target_pk):
-            return None
-        if not self._target_collection._res.can_discover(self._entry_point.user, target_pk):
-            return None
-        return LinkInstance(self._target_collection, self._forward_link_instance, self._backward_link_instance,
-                            self._source_pk, target_pk)
+        return self._get_many([target_pk])[0]
+
+    def _get_many(self, target_pks):
+        """ Returns a list of LinkInstances or None values for non discoverable links """
+        user = self._entry_point.user
+        rval = [None] * len(target_pks)
+        link_mask = self._forward_link_instance.can_discover_many(user, self._source_pk, target_pks)
+        indices = [i for i, allowed in enumerate(link_mask) if allowed]
+        if not indices:
+            return rval
+        target_mask = self._target_collection._res.can_discover_many(user, [target_pks[i] for i in indices])
+        for i, allowed in zip(indices, target_mask):
+            if allowed:
+                rval[i] = LinkInstance(self._target_collection, self._forward_link_instance,
+                                       self._backward_link_instance, self._source_pk, target_pks[i])
+        return rval
 
     def __iter__(self):
         if self._items is None:
@@ -401,7 +646,49 @@ class LinkCollection(Link):
         return len(self._items)
 
     def next(self):
-        return self._get(self._iter_items.next())
+        if not self._chunk:
+            target_pks = list(islice(self._iter_items, self.chunk_size))
+            if not target_pks:
+                raise StopIteration
+            self._chunk.extend(self._get_many(target_pks))
+        return self._chunk.popleft()
+
+    def iter_with_data(self, chunk_size=None):
+        """ Iterates over discoverable links of the collection fetching their data in chunks
+
+        If the forward link is a master one the data is fetched via
+        :meth:`Link.get_data_many <resource_api.interfaces.Link.get_data_many>`, otherwise via
+        :meth:`Link.get_data_reverse_many <resource_api.interfaces.Link.get_data_reverse_many>` of the backward link.
+        The data is authorized via
+        :meth:`Link.can_get_data_many <resource_api.interfaces.Link.can_get_data_many>`.
+
+        chunk_size (int = None)
+            amount of links to fetch the data for at once, by default *chunk_size* attribute of the collection is used
+
+        >>> for link in student.links.courses.iter_with_data():
+        >>>    print link.data["grade"]
+        """
+        self.__iter__()
+        user, forward = self._entry_point.user, self._forward_link_instance
+        chunk_size = chunk_size or self.chunk_size
+        all_target_pks = iter(self._items)
+        while True:
+            target_pks = list(islice(all_target_pks, chunk_size))
+            if not target_pks:
+                break
+            items = filter(None, self._get_many(target_pks))
+            if not items:
+                continue
+            target_pks = [item._target_pk for item in items]
+            if forward.master:
+                data = forward.get_data_many(user, self._source_pk, target_pks)
+            else:
+                data = self._backward_link_instance.get_data_reverse_many(user, target_pks, self._source_pk)
+            if not all(forward.can_get_data_many(user, self._source_pk, target_pks, data)):
+                raise AuthorizationError("Fetching link's data is not allowed")
+            for item, item_data in zip(items, data):
+                item._data = item_data
+                yield item
 
     def filter(self, params=None):
         """
@@ -452,6 +739,8 @@ class RootLinkCollection(LinkCollection):
     """
 
     def _clear(self):
+        if self._forward_link_instance.bulk_delete:
+            return self._clear_all()
         for lnk in self:
             if self._backward_link_instance.required and \
                self._backward_link_instance.cardinality == BaseLink.cardinalities.ONE:
@@ -469,19 +758,55 @@ class RootLinkCollection(LinkCollection):
     def _validate(self, links_data):
         if not isinstance(links_data, list):
             raise ValidationError("Links must be passed as a list of dicts")
-        count = 0
-        valid_links_data = []
+        if not links_data:
+            return []
         try:
-            for link_data in links_data:
-                valid_links_data.append(self._validate_item(link_data))
-                count += 1
+            valid_links_data = self._validate_many(links_data)
         except FrameworkError, msg:
-            raise ValidationError("@Element %d: %s" % (count, msg))
+            raise ValidationError("@Element 0: %s" % msg)
+        for count, item in enumerate(valid_links_data):
+            if isinstance(item, FrameworkError):
+                raise ValidationError("@Element %d: %s" % (count, item))
         return valid_links_data
 
     def _set(self, links_data):
-        for link_data in links_data:
-            self._create_item(link_data)
+        self._create_many(links_data)
+
+    def _validate_records(self, records):
+        """ Does the same checks as *_validate* for the lists of links of several new resources using bulk DAL calls """
+        rval = [None] * len(records)
+        links_data, groups = [], []
+        for index, record in enumerate(records):
+            if not isinstance(record, list):
+                rval[index] = ValidationError("Links must be passed as a list of dicts")
+                continue
+            rval[index] = []
+            links_data.extend(record)
+            groups.extend([index] * len(record))
+        if not links_data:
+            return rval
+        try:
+            valid_links_data = self._validate_many(links_data, groups)
+        except FrameworkError, msg:
+            for index in set(groups):
+                rval[index] = ValidationError("@Element 0: %s" % msg)
+            return rval
+        for index, item in zip(groups, valid_links_data):
+            if isinstance(rval[index], FrameworkError):
+                continue
+            if isinstance(item, FrameworkError):
+                rval[index] = ValidationError("@Element %d: %s" % (len(rval[index]), item))
+            else:
+                rval[index].append(item)
+        return rval
+
+    def _set_records(self, records):
+        """ Stores validated (source PK, list of link data) tuples of several resources using bulk DAL calls """
+        links_data, source_pks = [], []
+        for pk, record in records:
+            links_data.extend(record)
+            source_pks.extend([pk] * len(record))
+        self._create_many(links_data, source_pks)
 
     def get(self, target_pk):
         """
@@ -511,3 +836,24 @@ class RootLinkCollection(LinkCollection):
         valid_data = self._validate_item(data)
         self._validate_changability(None, "It is not allowed to create links in unchangeable collections")
         return self._create_item(valid_data)
+
+    def create_many(self, items):
+        """ Creates several links at once using bulk DAL calls where possible
+
+        items (list of dicts)
+            data of the links to be created, each of them has to have **@target** key
+
+        Returns a list with one entry per item: either a LinkInstance or an error (FrameworkError instance) that
+        prevented the link from being created.
+
+        >>> student.links.courses.create_many([{"@target": "Maths", "grade": 4}, {"@target": "Sports"}])
+        [<LinkInstance object>, <LinkInstance object>]
+        """
+        if not isinstance(items, list):
+            raise ValidationError("Links must be passed as a list of dicts")
+        rval = self._validate_many(items)
+        self._validate_changability(None, "It is not allowed to create links in unchangeable collections")
+        indices = [index for index, item in enumerate(rval) if not isinstance(item, FrameworkError)]
+        for index, lnk in zip(indices, self._create_many([rval[index] for index in indices])):
+            rval[index] = lnk
+        return rval
@@ -2,16 +2,29 @@
 Copyright (c) 2014-2015 F-Secure
 See LICENSE for details
 """
-from .errors import DoesNotExist, ValidationError, DataConflictError, AuthorizationError
+from .errors import DoesNotExist, ValidationError, DataConflictError, AuthorizationError, FrameworkError
 from .link import LinkHolder
 
 
+def _project(data, fields):
+    return dict((key, data[key]) for key in fields if key in data)
+
+
 class ResourceContainer(object):
 
     def __init__(self, entry_point, resource_interface):
         self._entry_point = entry_point
         self._res = resource_interface
 
+    def _validate_fields(self, fields):
+        if fields is None:
+            return None
+        fields = frozenset(fields)
+        unknown = fields.difference(self._res.schema.fields)
+        if unknown and not self._res.schema.has_additional_fields:
+            raise ValidationError("Unknown fields: %s" % ", ".join(sorted(unknown)))
+        return fields
+
 
 class ResourceCollection(ResourceContainer):
     """
@@ -24,12 +37,29 @@ class ResourceCollection(ResourceContainer):
     >>> for student in student_collection:
     >>>    ...
 
-    If :meth:`Resource.get_uris <resource_api.interfaces.Resource.get_uris>` is implemented to return an
-    indexable entity the collection elements can be accessed by index as well:
+    The collection elements can be accessed by index as well:
 
     >>> student = student_collection[15]
+
+    Non negative indices, slices and :meth:`pages <resource_api.resource.ResourceCollection.page>` are fetched via
+    :meth:`Resource.get_uris_page <resource_api.interfaces.Resource.get_uris_page>` without loading the whole
+    collection:
+
+    >>> students = student_collection[100:150]
+
+    Negative indices and slices with steps, :code:`len(collection)` and iteration load all the PKs of the collection
+    via :meth:`Resource.get_uris <resource_api.interfaces.Resource.get_uris>` - use
+    :meth:`count <resource_api.resource.ResourceCollection.count>` to get the size of a big collection.
+
+    In order to fetch the data of many items with a few DAL calls iterate over the collection with
+    :meth:`iter_with_data <resource_api.resource.ResourceCollection.iter_with_data>`:
+
+    >>> for student in student_collection.iter_with_data():
+    >>>    student.data
     """
 
+    chunk_size = 100
+
     def __init__(self, entry_point, resource_interface, params=None):
         super(ResourceCollection, self).__init__(entry_point, resource_interface)
         self._params = params or {}
@@ -38,21 +68,55 @@ class ResourceCollection(ResourceContainer):
     def _get(self, pk):
         return ResourceInstance(self._entry_point, self._res, pk)
 
+    def _iter_chunks(self, chunk_size=None):
+        self.__iter__()
+        chunk_size = chunk_size or self.chunk_size
+        chunk = []
+        for pk in self._items:
+            chunk.append(pk)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _get_params(self, error_message):
+        if not self._res.can_get_uris(self._entry_point.user):
+            raise AuthorizationError(error_message)
+        return self._res.query_schema.deserialize(self._params, validate_required_constraint=False, with_errors=False)
+
     def __iter__(self):
         if self._items is None:
-            if not self._res.can_get_uris(self._entry_point.user):
-                raise AuthorizationError("Resource collection retrivial is not allowed")
-            params = self._res.query_schema.deserialize(self._params, validate_required_constraint=False,
-                                                        with_errors=False)
+            params = self._get_params("Resource collection retrivial is not allowed")
             self._items = self._res.get_uris(self._entry_point.user, params)
             self._iter_items = iter(self._items)
         return self
 
     def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._get_slice(key)
+        if self._items is None and isinstance(key, (int, long)) and key >= 0:
+            items = self._get_slice(slice(key, key + 1))
+            if not items:
+                raise IndexError("Resource collection index out of range")
+            return items[0]
         self.__iter__()
         target_pk = self._items[key]
         return self._get(target_pk)
 
+    def _get_slice(self, key):
+        start, stop = key.start or 0, key.stop
+        pageable = key.step in (None, 1) and start >= 0 and (stop is None or stop >= 0)
+        if self._items is not None or not pageable:
+            self.__iter__()
+            return [self._get(pk) for pk in list(self._items)[key]]
+        if stop is not None and stop <= start:
+            return []
+        limit = None if stop is None else stop - start
+        params = self._get_params("Resource collection retrivial is not allowed")
+        pks, _ = self._res.get_uris_page(self._entry_point.user, params, limit=limit, offset=start)
+        return [self._get(pk) for pk in pks]
+
     def __len__(self):
         self.__iter__()
         return len(self._items)
@@ -89,12 +153,118 @@ class ResourceCollection(ResourceContainer):
         >>> student_collection.count()
         4569
         """
-        if not self._res.can_get_uris(self._entry_point.user):
-            raise AuthorizationError("Resource collection count retrivial is not allowed")
-        params = self._res.query_schema.deserialize(self._params, validate_required_constraint=False,
-                                                    with_errors=False)
+        params = self._get_params("Resource collection count retrivial is not allowed")
         return self._res.get_count(self._entry_point.user, params)
 
+    def page(self, limit, cursor=None, offset=0):
+        """ Returns a tuple: a list with at most *limit* items and a cursor to fetch the next page with or None if it is
+        the last page
+
+        limit (int)
+            maximum amount of items in the page
+        cursor (None|string)
+            value returned together with the previous page
+        offset (int = 0)
+            amount of items to skip, ignored if *cursor* is defined
+
+        >>> students, cursor = student_collection.page(50)
+        >>> while cursor is not None:
+        >>>     more_students, cursor = student_collection.page(50, cursor)
+        """
+        if limit < 1:
+            raise ValidationError("Limit must be a positive number")
+        if offset < 0:
+            raise ValidationError("Offset must not be negative")
+        params = self._get_params("Resource collection retrivial is not allowed")
+        pks, next_cursor = self._res.get_uris_page(self._entry_point.user, params, limit=limit, offset=offset,
+                                                   cursor=cursor)
+        return [self._get(pk) for pk in pks], next_cursor
+
+    def iter_with_data(self, chunk_size=None, fields=None):
+        """ Iterates over the collection fetching the data of the items in chunks via
+        :meth:`Resource.get_data_many <resource_api.interfaces.Resource.get_data_many>`
+
+        chunk_size (int = None)
+            amount of items to fetch the data for at once, by default *chunk_size* attribute of the collection is used
+        fields (None|list of strings = None)
+            if defined, only these fields are fetched via
+            :meth:`Resource.get_partial_data_many <resource_api.interfaces.Resource.get_partial_data_many>` and are
+            available via :meth:`get_data <resource_api.resource.ResourceInstance.get_data>` of the items
+
+        >>> for student in student_collection.iter_with_data(chunk_size=500):
+        >>>    print student.data["first_name"]
+        """
+        fields = self._validate_fields(fields)
+        user = self._entry_point.user
+        for pks in self._iter_chunks(chunk_size):
+            if fields is None:
+                data = self._res.get_data_many(user, pks)
+            else:
+                data = self._res.get_partial_data_many(user, pks, fields)
+            if not all(self._res.can_get_data_many(user, pks, data)):
+                raise AuthorizationError("Resource fetching is not allowed")
+            for pk, item_data in zip(pks, data):
+                if fields is not None:
+                    item_data = _project(item_data, fields)
+                yield ResourceInstance(self._entry_point, self._res, pk, item_data, fields)
+
+    def fetch_data(self, chunk_size=None, fields=None):
+        """ Returns a list with the data of all the items in the collection
+
+        >>> student_collection.fetch_data()
+        [{"first_name": "John", ...}, {"first_name": "Jane", ...}]
+        >>> student_collection.fetch_data(fields=["first_name"])
+        [{"first_name": "John"}, {"first_name": "Jane"}]
+        """
+        return [item.get_data(fields) for item in self.iter_with_data(chunk_size, fields)]
+
+    def update_all(self, data):
+        """ Changes specified fields of all the items in the collection and returns their count
+
+        The data is validated once, authorization is done via
+        :meth:`Resource.can_update_many <resource_api.interfaces.Resource.can_update_many>` and the items are stored in
+        chunks via :meth:`Resource.update_many <resource_api.interfaces.Resource.update_many>`.
+
+        >>> student_collection.filter(params={"graduated": True}).update_all({"active": False})
+        42
+        """
+        data = self._res.schema.deserialize(data, validate_required_constraint=False)
+        user = self._entry_point.user
+        chunks = list(self._iter_chunks())
+        for pks in chunks:
+            if not all(self._res.can_update_many(user, pks, data)):
+                raise AuthorizationError("Resource updating is not allowed")
+        unchangeable = self._res.schema.find_fields(readonly=True, changeable=False)
+        intersection = unchangeable.intersection(set(data.keys()))
+        if intersection:
+            raise ValidationError("Unchangeable fields: %s" % ", ".join(intersection))
+        for pks in chunks:
+            self._res.update_many(user, pks, data)
+        return sum(map(len, chunks))
+
+    def delete_all(self):
+        """ Removes all the items in the collection together with their links and returns their count
+
+        Authorization is done via :meth:`Resource.can_delete_many <resource_api.interfaces.Resource.can_delete_many>`
+        and the items are removed in chunks via
+        :meth:`Resource.delete_many <resource_api.interfaces.Resource.delete_many>`. The links of every chunk are
+        removed with a constant number of DAL calls per link type via
+        :meth:`Link.get_uris_many <resource_api.interfaces.Link.get_uris_many>` and
+        :meth:`Link.delete_many <resource_api.interfaces.Link.delete_many>`.
+
+        >>> student_collection.filter(params={"graduated": True}).delete_all()
+        42
+        """
+        user = self._entry_point.user
+        chunks = list(self._iter_chunks())
+        for pks in chunks:
+            if not all(self._res.can_delete_many(user, pks)):
+                raise AuthorizationError("Resource deletion is not allowed")
+        for pks in chunks:
+            LinkHolder._clear_many(self._entry_point, self._res, pks)
+            self._res.delete_many(user, pks)
+        return sum(map(len, chunks))
+
     def serialize(self):
         rval = []
         for item in self:
@@ -104,7 +274,8 @@ class ResourceCollection(ResourceContainer):
 
 class RootResourceCollection(ResourceCollection):
     """
-    Root resource collection is actually a normal resource collection with two extra methods: *create* and *get*.
+    Root resource collection is actually a normal resource collection with extra methods: *create*, *create_many* and
+    *get*.
     """
 
     def get(self, pk):
@@ -124,6 +295,32 @@ class RootResourceCollection(ResourceCollection):
             _err()
         return ResourceInstance(self._entry_point, self._res, pk)
 
+    def _get_many(self, pks):
+        """ Does the same checks as *get* for several PKs using bulk DAL calls
+
+        Returns a list with one entry per PK: either a ResourceInstance or a DoesNotExist error.
+        """
+        user = self._entry_point.user
+        rval = [None] * len(pks)
+        valid = []
+        for index, pk in enumerate(pks):
+            try:
+                valid.append((index, self._res.UriPolicy.deserialize(pk)))
+            except ValidationError, msg:
+                rval[index] = DoesNotExist("PK validation failed: %s" % msg)
+        for check in (self._res.exists_many, self._res.can_discover_many):
+            mask = check(user, [pk for _, pk in valid]) if valid else []
+            passed = []
+            for (index, pk), ok in zip(valid, mask):
+                if ok:
+                    passed.append((index, pk))
+                else:
+                    rval[index] = DoesNotExist("Resource with pk %r does not exist." % pk)
+            valid = passed
+        for index, pk in valid:
+            rval[index] = ResourceInstance(self._entry_point, self._res, pk)
+        return rval
+
     def create(self, data, link_data=None):
         """
         >>> student_collection = entry_point.get_resource(Student)
@@ -137,12 +334,7 @@ class RootResourceCollection(ResourceCollection):
         data = self._res.schema.deserialize(data)
         if not self._res.can_create(self._entry_point.user, data):
             raise AuthorizationError("Resource creation is not allowed")
-        rval = ResourceInstance(self._entry_point, self._res, None)
-        readonly = self._res.schema.find_fields(readonly=True)
-        intersection = readonly.intersection(set(data.keys()))
-        if intersection:
-            raise ValidationError("Readonly fields can not be set: %s" % ", ".join(intersection))
-        valid_link_data = rval.links._validate(link_data)
+        rval, valid_link_data = self._validate_new(data, link_data)
         pk = self._res.UriPolicy.generate_pk(data, link_data)
         if pk is None:  # DAL has to generate PK in the UriPolicy instance didn't
             pk = self._res.create(self._entry_point.user, pk, data)
@@ -154,6 +346,112 @@ class RootResourceCollection(ResourceCollection):
         rval.links._set(valid_link_data)
         return rval
 
+    def _validate_readonly(self, data):
+        readonly = self._res.schema.find_fields(readonly=True)
+        intersection = readonly.intersection(set(data.keys()))
+        if intersection:
+            raise ValidationError("Readonly fields can not be set: %s" % ", ".join(intersection))
+
+    def _validate_new(self, data, link_data):
+        rval = ResourceInstance(self._entry_point, self._res, None)
+        self._validate_readonly(data)
+        return rval, rval.links._validate(link_data)
+
+    def create_many(self, records):
+        """ Creates several resources at once using bulk DAL calls where possible
+
+        records (list of dicts)
+            data of the resources to be created, link data can be passed via **@links** key of each dict
+
+        Returns a list with one entry per record: either a ResourceInstance or an error (FrameworkError instance)
+        that prevented the resource from being created.
+
+        The links of all the records are grouped by link name - each link type is validated and stored via a single
+        :meth:`Link.can_create_many <resource_api.interfaces.Link.can_create_many>`,
+        :meth:`Link.exists_many <resource_api.interfaces.Link.exists_many>` and
+        :meth:`Link.create_many <resource_api.interfaces.Link.create_many>` call.
+
+        >>> student_collection = entry_point.get_resource(Student)
+        >>> student_collection.create_many([
+        >>>     {"email": "foo@bar.com", ...},
+        >>>     {"email": "bar@foo.com", ..., "@links": {"courses": [{"@target": "Maths"}]}}])
+        [<ResourceInstance object>, <ResourceInstance object>]
+        """
+        user = self._entry_point.user
+        rval = [None] * len(records)
+
+        def _safe(index, func, *args):
+            try:
+                return func(*args)
+            except FrameworkError, e:
+                rval[index] = e
+
+        def _split(record):
+            if not isinstance(record, dict):
+                raise ValidationError("Record must be a dict")
+            record = dict(record)
+            link_data = record.pop("@links", None)
+            return record, link_data
+
+        split = []
+        for index, record in enumerate(records):
+            item = _safe(index, _split, record)
+            if item is not None:
+                split.append((index,) + item)
+
+        deserialized = []
+        rows, errors = self._res.schema._deserialize_many([record for _, record, _ in split])
+        for position, ((index, _, link_data), data) in enumerate(zip(split, rows)):
+            if position in errors:
+                rval[index] = ValidationError(errors[position])
+            else:
+                deserialized.append((index, data, link_data))
+
+        def _validate(data, allowed):
+            if not allowed:
+                raise AuthorizationError("Resource creation is not allowed")
+            self._validate_readonly(data)
+            return True
+
+        authorized = []
+        mask = self._res.can_create_many(user, [data for _, data, _ in deserialized]) if deserialized else []
+        for (index, data, link_data), allowed in zip(deserialized, mask):
+            if _safe(index, _validate, data, allowed):
+                authorized.append((index, data, link_data))
+
+        def _generate_pk(valid_link_data, data, link_data):
+            if isinstance(valid_link_data, FrameworkError):
+                raise valid_link_data
+            return self._res.UriPolicy.generate_pk(data, link_data), valid_link_data
+
+        validated = []
+        links_data = LinkHolder._validate_many(self._entry_point, self._res,
+                                               [link_data for _, _, link_data in authorized])
+        for (index, data, link_data), valid_link_data in zip(authorized, links_data):
+            item = _safe(index, _generate_pk, valid_link_data, data, link_data)
+            if item is not None:
+                validated.append((index, data) + item)
+
+        pks = [pk for _, _, pk, _ in validated if pk is not None]
+        existing = set([pk for pk, exists in zip(pks, self._res.exists_many(user, pks) if pks else []) if exists])
+        to_create = []
+        for item in validated:
+            index, pk = item[0], item[2]
+            if pk is not None and pk in existing:
+                rval[index] = DataConflictError("Resource with PK %r already exists" % pk)
+                continue
+            if pk is not None:
+                existing.add(pk)
+            to_create.append(item)
+
+        if to_create:
+            created_pks = self._res.create_many(user, [(pk, data) for _, data, pk, _ in to_create])
+            LinkHolder._set_many(self._entry_point, self._res,
+                                 [(pk, item[3]) for item, pk in zip(to_create, created_pks)])
+            for (index, _, _, _), pk in zip(to_create, created_pks):
+                rval[index] = ResourceInstance(self._entry_point, self._res, pk)
+        return rval
+
 
 class ResourceInstance(ResourceContainer):
     """
@@ -162,9 +460,11 @@ class ResourceInstance(ResourceContainer):
     :class:`resource collections <resource_api.resource.ResourceCollection>`.
     """
 
-    def __init__(self, entry_point, resource_interface, pk):
+    def __init__(self, entry_point, resource_interface, pk, data=None, fields=None):
         super(ResourceInstance, self).__init__(entry_point, resource_interface)
         self._pk = pk
+        self._data = data
+        self._fields = fields
         self._links = LinkHolder(entry_point, resource_interface, pk)
 
     def _set_pk(self, pk):
@@ -184,11 +484,33 @@ class ResourceInstance(ResourceContainer):
         >>> student.data
         {"first_name": "John", "last_name": "Smith", "email": "foo@bar.com", "birthday": "1987-02-21T22:22:22"}
         """
+        if self._data is not None and self._fields is None:
+            return self._data
         saved_data = self._res.get_data(self._entry_point.user, self._pk)
         if not self._res.can_get_data(self._entry_point.user, self._pk, saved_data):
             raise AuthorizationError("Resource fetching is not allowed")
         return saved_data
 
+    def get_data(self, fields=None):
+        """ Returns data associated with the resource restricted to the specified fields
+
+        fields (None|list of strings = None)
+            names of the fields to return, all the fields are returned if it is None. The names are passed to
+            :meth:`Resource.get_partial_data <resource_api.interfaces.Resource.get_partial_data>`
+
+        >>> student.get_data(fields=["first_name", "last_name"])
+        {"first_name": "John", "last_name": "Smith"}
+        """
+        fields = self._validate_fields(fields)
+        if fields is None:
+            return self.data
+        if self._data is not None and (self._fields is None or self._fields.issuperset(fields)):
+            return _project(self._data, fields)
+        saved_data = self._res.get_partial_data(self._entry_point.user, self._pk, fields)
+        if not self._res.can_get_data(self._entry_point.user, self._pk, saved_data):
+            raise AuthorizationError("Resource fetching is not allowed")
+        return _project(saved_data, fields)
+
     @property
     def pk(self):
         """ Returns PK of the resource
@@ -213,6 +535,7 @@ class ResourceInstance(ResourceContainer):
         if intersection:
             raise ValidationError("Unchangeable fields: %s" % ", ".join(intersection))
         self._res.update(self._entry_point.user, self._pk, data)
+        self._data = self._fields = None
 
     def delete(self):
         """ Removes the resource
@@ -226,9 +549,11 @@ class ResourceInstance(ResourceContainer):
             raise AuthorizationError("Resource deletion is not allowed")
         self.links._clear()
         self._res.delete(self._entry_point.user, self._pk)
+        self._data = self._fields = None
 
-    def serialize(self):
-        return self._res.schema.serialize(self.data)
+    def serialize(self, fields=None):
+        fields = self._validate_fields(fields)
+        return self._res.schema.serialize(self.get_data(fields), fields)
 
     def serialize_pk(self):
         return self._res.UriPolicy.serialize(self.pk)
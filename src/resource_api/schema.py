@@ -6,12 +6,14 @@ import re
 import inspect
 import datetime
 from copy import copy
+from itertools import izip
 from collections import defaultdict
 
 import isodate
 import pytz
 
 from .errors import ValidationError, DeclarationError
+from . import isotime
 
 
 class BaseField(object):
@@ -69,7 +71,7 @@ class BaseIsoField(BaseField):
     """
 
     def _parse(self, val):
-        """ Supposed to transform the value into a valid Python type using a respective isodate function """
+        """ Supposed to transform the value into a valid Python type using a respective isotime function """
         raise NotImplementedError
 
     def _to_python(self, val):
@@ -98,7 +100,7 @@ class DateTimeField(BaseIsoField):
     verbose_name = "datetime"
 
     def _parse(self, val):
-        return isodate.parse_datetime(val)
+        return isotime.parse_datetime(val)
 
     def _to_python(self, val):
         val = super(DateTimeField, self)._to_python(val)
@@ -121,7 +123,7 @@ class DateField(BaseIsoField):
     verbose_name = "date"
 
     def _parse(self, val):
-        return isodate.parse_date(val)
+        return isotime.parse_date(val)
 
 
 class TimeField(BaseIsoField):
@@ -131,7 +133,7 @@ class TimeField(BaseIsoField):
     verbose_name = "time"
 
     def _parse(self, val):
-        return isodate.parse_time(val)
+        return isotime.parse_time(val)
 
     def _to_python(self, val):
         val = super(TimeField, self)._to_python(val)
@@ -474,11 +476,7 @@ class ObjectField(BaseField):
         super(ObjectField, self).__init__(**kwargs)
 
         if isinstance(schema, dict):
-            class Tmp(Schema):
-                pass
-            for key, value in schema.iteritems():
-                setattr(Tmp, key, value)
-            schema = Tmp
+            schema = SchemaMetaClass("Tmp", (Schema,), dict(schema))
         elif inspect.isclass(schema) and not issubclass(schema, Schema):
             class Tmp(schema, Schema):
                 pass
@@ -501,6 +499,25 @@ class ObjectField(BaseField):
         return self._schema.serialize(val)
 
 
+class SchemaMetaClass(type):
+    """ Collects the fields of a schema once - when the schema class is created.
+
+    Every schema class gets its own copies of the fields so that altering them does not affect base classes.
+    """
+
+    def __init__(cls, name, bases, dct):
+        super(SchemaMetaClass, cls).__init__(name, bases, dct)
+        cls.fields = {}
+        cls._required_fields = set()
+        cls._defaults = {}
+        cls._found_fields = {}
+        cls._compiled_deserializer = None
+        for field_name in dir(cls):
+            field = getattr(cls, field_name)
+            if isinstance(field, BaseField):
+                cls._add_field(field_name, copy(field))
+
+
 class Schema(object):
     """ Base class for containers that would hold one or many fields.
 
@@ -508,6 +525,9 @@ class Schema(object):
 
     has_additional_fields (bool = False)
         If *True* it shall be possible to have extra fields inside input data that will not be validated
+    use_compiled_deserializer (bool = False)
+        If *True* *deserialize* uses a function generated for the schema class with validation of integer, float,
+        string and boolean fields inlined. The results and the errors are the same as with the default implementation.
 
     NOTE: when defining schemas do not use any of the following reserved keywords:
 
@@ -516,39 +536,50 @@ class Schema(object):
         - get_schema
         - serialize
         - has_additional_fields
+        - use_compiled_deserializer
     """
 
+    __metaclass__ = SchemaMetaClass
+
     has_additional_fields = False
+    use_compiled_deserializer = False
 
     def __init__(self, validate_required_constraint=True, with_errors=True):
-        self._required_fields = set()
-        self._defaults = {}
         self._validate_required_constraint, self._with_errors = validate_required_constraint, with_errors
 
-        self.fields = {}
-
-        for field_name in dir(self):
-            field = getattr(self, field_name)
-            if not isinstance(field, BaseField):
-                continue
-            self._add_field(field_name, copy(field))
-
-    def _add_field(self, field_name, field):
-        setattr(self, field_name, field)
-        self.fields[field_name] = field
+    @classmethod
+    def _add_field(cls, field_name, field):
+        setattr(cls, field_name, field)
+        cls.fields[field_name] = field
         if isinstance(field, BaseField) and field.required:
-            self._required_fields.add(field_name)
+            cls._required_fields.add(field_name)
         if isinstance(field, BaseSimpleField) and field.default is not None:
-            self._defaults[field_name] = field.default
-
-    def find_fields(self, **kwargs):
+            cls._defaults[field_name] = field.default
+        cls._found_fields.clear()
+        cls._compiled_deserializer = None
+
+    @classmethod
+    def _make_optional(cls, field_name):
+        """ Makes the field neither required nor having a default value """
+        field = cls.fields[field_name]
+        cls._required_fields.discard(field_name)
+        cls._defaults.pop(field_name, None)
+        field.default = None
+        field.required = False
+        cls._compiled_deserializer = None
+
+    @classmethod
+    def find_fields(cls, **kwargs):
         """ Returns a set of fields where each field contains one or more specified keyword arguments """
-        rval = set()
-        for key, value in kwargs.iteritems():
-            for field_name, field in self.fields.iteritems():
-                if field.kwargs.get(key) == value:
-                    rval.add(field_name)
-        return rval
+        key = tuple(sorted(kwargs.items()))
+        if key not in cls._found_fields:
+            rval = set()
+            for key_name, value in kwargs.iteritems():
+                for field_name, field in cls.fields.iteritems():
+                    if field.kwargs.get(key_name) == value:
+                        rval.add(field_name)
+            cls._found_fields[key] = frozenset(rval)
+        return cls._found_fields[key]
 
     def deserialize(self, data, validate_required_constraint=True, with_errors=True):
         """ Validates and transforms input data into something that is used withing data access layer
@@ -564,6 +595,12 @@ class Schema(object):
             When one or more fields has errors and *with_errors=True*
         """
 
+        if self.use_compiled_deserializer:
+            cls = self.__class__
+            if cls._compiled_deserializer is None:
+                cls._compiled_deserializer = staticmethod(compile_deserializer(cls))
+            return self._compiled_deserializer(data, validate_required_constraint, with_errors)
+
         if not isinstance(data, dict):
             raise ValidationError({"__all__": "Has to be a dict"})
 
@@ -595,6 +632,69 @@ class Schema(object):
         else:
             return transformed
 
+    def deserialize_many(self, rows, validate_required_constraint=True, with_errors=True):
+        """ Validates and transforms a list of input documents. Unlike calling *deserialize* for each of them the
+        data is processed field by field.
+
+        rows (list of dicts)
+            Incoming data
+        validate_required_constraint (bool = True)
+            If *False*, schema will not validate required constraint of the fields inside
+        with_errors (bool = True)
+            If *False*, all fields that contain errors are silently excluded
+
+        @raises ValidationError
+            When one or more rows have errors and *with_errors=True*. Errors are reported as
+            {row_index: {field_name: [messages]}}
+
+        >>> schema.deserialize_many([{"one": "1"}, {"one": "foo"}])
+        ValidationError({1: {"one": ["Conversion of value 'foo' failed"]}})
+        """
+        transformed, errors = self._deserialize_many(rows, validate_required_constraint)
+        if errors and with_errors:
+            raise ValidationError(errors)
+        return transformed
+
+    def _deserialize_many(self, rows, validate_required_constraint=True):
+        """ Returns a list of transformed rows and a dict with errors of invalid rows """
+        for index, data in enumerate(rows):
+            if not isinstance(data, dict):
+                raise ValidationError({index: {"__all__": "Has to be a dict"}})
+
+        transformed = [dict(self._defaults) for _ in rows]
+        errors = defaultdict(lambda: defaultdict(list))
+
+        for key, field in self.fields.iteritems():
+            indices = [index for index, data in enumerate(rows) if key in data]
+            if not indices:
+                continue
+            results = _deserialize_column(field, [rows[index][key] for index in indices])
+            for index, (error, value) in izip(indices, results):
+                if error is None:
+                    transformed[index][key] = value
+                else:
+                    errors[index][key].append(error)
+
+        field_names = frozenset(self.fields)
+        for index, data in enumerate(rows):
+            if field_names.issuperset(data):
+                continue
+            for key, value in data.iteritems():
+                if key in field_names:
+                    continue
+                if self.has_additional_fields:
+                    transformed[index][key] = value
+                else:
+                    errors[index]["__all__"].append("Field %r is not defined" % key)
+
+        if validate_required_constraint:
+            for field in self._required_fields:
+                for index, row in enumerate(transformed):
+                    if row.get(field) is None and field not in errors.get(index, ()):
+                        errors[index][field].append("Required field is missing")
+
+        return transformed, dict((index, dict(row_errors)) for index, row_errors in errors.iteritems())
+
     def get_schema(self):
         """ Returns a JSONizable schema that could be transfered over the wire """
         rval = {}
@@ -604,10 +704,18 @@ class Schema(object):
             rval["has_additional_fields"] = True
         return rval
 
-    def serialize(self, val):
-        """ Transforms outgoing data into a JSONizable dict """
+    def serialize(self, val, fields=None):
+        """ Transforms outgoing data into a JSONizable dict
+
+        val (dict)
+            Outgoing data
+        fields (None|set of strings = None)
+            If defined, only the fields with these names are included
+        """
         rval = {}
         for key, value in val.iteritems():
+            if fields is not None and key not in fields:
+                continue
             field = self.fields.get(key)
             if field:
                 rval[key] = field.serialize(value)
@@ -616,3 +724,179 @@ class Schema(object):
             else:
                 pass
         return rval
+
+
+def _deserialize_column(field, values):
+    """ Deserializes a list of values of a single field. Returns a list of (error message, value) pairs """
+    if type(field) in (IntegerField, FloatField):
+        return _deserialize_digits(field, values)
+    rval = []
+    for val in values:
+        try:
+            rval.append((None, field.deserialize(val)))
+        except ValidationError, e:
+            rval.append((e.message, None))
+    return rval
+
+
+def _deserialize_digits(field, values):
+    """ Does the same as *deserialize* method of IntegerField or FloatField for every value in a single loop """
+    python_type, min_val, max_val, required = field.python_type, field.min_val, field.max_val, field.required
+    choices = frozenset(field.choices) if field.choices else None
+    invalid_choices = frozenset(field.invalid_choices) if field.invalid_choices else None
+    types = (basestring, int, long, float)
+    rval = []
+    append = rval.append
+    for val in values:
+        if val is None:
+            append(("Value is required and thus cannot be None", None) if required else (None, None))
+            continue
+        if not isinstance(val, types):
+            append(("Has to be a digit or a string convertable to digit", None))
+            continue
+        try:
+            val = python_type(val)
+        except ValueError:
+            append(("Conversion of value %r failed" % (val,), None))
+            continue
+        if choices is not None and val not in choices:
+            append(("Val %r must be one of %r" % (val, field.choices), None))
+        elif invalid_choices is not None and val in invalid_choices:
+            append(("Val %r must NOT be one of %r" % (val, field.invalid_choices), None))
+        elif min_val is not None and val < min_val:
+            append(("Digit %r is too small. Has to be at least %r." % (val, min_val), None))
+        elif max_val is not None and val > max_val:
+            append(("Digit %r is too big. Has to be at max %r." % (val, max_val), None))
+        else:
+            append((None, val))
+    return rval
+
+
+class _DeserializerSource(object):
+    """ Accumulates source code of a generated deserializer together with the objects it refers to """
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {"ValidationError": ValidationError, "defaultdict": defaultdict}
+
+    def add(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def ref(self, name, value):
+        self.namespace[name] = value
+        return name
+
+    def error(self, indent, key, message):
+        self.add(indent, "if errors is None:")
+        self.add(indent + 1, "errors = defaultdict(list)")
+        self.add(indent, "errors[%s].append(%s)" % (key, message))
+
+
+_INLINE_TYPES = {
+    IntegerField: ((basestring, int, long, float), "Has to be a digit or a string convertable to digit"),
+    FloatField: ((basestring, int, long, float), "Has to be a digit or a string convertable to digit"),
+    StringField: ((basestring,), "Has to be string"),
+    BooleanField: ((bool,), "Has to be a digit or a string convertable to digit")
+}
+
+
+def _compile_field(src, index, field_name, field):
+    key = repr(field_name)
+    src.add(1, "if %s in data:" % key)
+    if type(field) not in _INLINE_TYPES:
+        src.add(2, "try:")
+        src.add(3, "transformed[%s] = %s.deserialize(data[%s])" % (key, src.ref("field_%d" % index, field), key))
+        src.add(2, "except ValidationError, e:")
+        src.error(3, key, "e.message")
+        return
+
+    types, type_message = _INLINE_TYPES[type(field)]
+    src.add(2, "val = data[%s]" % key)
+    src.add(2, "if val is None:")
+    if field.required:
+        src.error(3, key, repr("Value is required and thus cannot be None"))
+    else:
+        src.add(3, "transformed[%s] = None" % key)
+    src.add(2, "elif not isinstance(val, %s):" % src.ref("types_%d" % index, types))
+    src.error(3, key, repr(type_message))
+    src.add(2, "else:")
+    src.add(3, "try:")
+    src.add(4, "val = %s(val)" % src.ref("python_type_%d" % index, field.python_type))
+    src.add(3, "except ValueError:")
+    src.error(4, key, "'Conversion of value %r failed' % (val,)")
+
+    checks = []
+    choices, invalid_choices = getattr(field, "choices", None), getattr(field, "invalid_choices", None)
+    if choices:
+        name = src.ref("choices_%d" % index, choices)
+        checks.append(("val not in %s" % name, "'Val %%r must be one of %%r' %% (val, %s)" % name))
+    if invalid_choices:
+        name = src.ref("invalid_choices_%d" % index, invalid_choices)
+        checks.append(("val in %s" % name, "'Val %%r must NOT be one of %%r' %% (val, %s)" % name))
+    if isinstance(field, DigitField):
+        if field.min_val is not None:
+            name = src.ref("min_val_%d" % index, field.min_val)
+            checks.append(("val < %s" % name, "'Digit %%r is too small. Has to be at least %%r.' %% (val, %s)" % name))
+        if field.max_val is not None:
+            name = src.ref("max_val_%d" % index, field.max_val)
+            checks.append(("val > %s" % name, "'Digit %%r is too big. Has to be at max %%r.' %% (val, %s)" % name))
+    if isinstance(field, StringField):
+        message = "'Length is too small. Is %%r has to be at least %%r.' %% (len(val), %s)"
+        if field.min_length is not None:
+            name = src.ref("min_length_%d" % index, field.min_length)
+            checks.append(("len(val) < %s" % name, message % name))
+        if field.max_length is not None:
+            name = src.ref("max_length_%d" % index, field.max_length)
+            checks.append(("len(val) > %s" % name, message % name))
+        if field.regex is not None:
+            name = src.ref("regex_%d" % index, field.regex)
+            checks.append(("not %s.match(val)" % name, "'%%r did not match regexp %%r' %% (val, %s.pattern)" % name))
+
+    src.add(3, "else:")
+    keyword = "if"
+    for condition, message in checks:
+        src.add(4, "%s %s:" % (keyword, condition))
+        src.error(5, key, message)
+        keyword = "elif"
+    if checks:
+        src.add(4, "else:")
+        src.add(5, "transformed[%s] = val" % key)
+    else:
+        src.add(4, "transformed[%s] = val" % key)
+
+
+def compile_deserializer(schema_class):
+    """ Generates a function that does the same as *deserialize* method of the schema class with validation of simple
+    fields inlined
+    """
+    src = _DeserializerSource()
+    src.add(0, "def deserialize(data, validate_required_constraint=True, with_errors=True):")
+    src.add(1, "if not isinstance(data, dict):")
+    src.add(2, "raise ValidationError({'__all__': 'Has to be a dict'})")
+    src.add(1, "transformed = dict(%s)" % src.ref("defaults", dict(schema_class._defaults)))
+    src.add(1, "errors = None")
+
+    for index, (field_name, field) in enumerate(sorted(schema_class.fields.iteritems())):
+        _compile_field(src, index, field_name, field)
+
+    src.add(1, "if not %s.issuperset(data):" % src.ref("field_names", frozenset(schema_class.fields)))
+    src.add(2, "for key in data:")
+    src.add(3, "if key not in field_names:")
+    if schema_class.has_additional_fields:
+        src.add(4, "transformed[key] = data[key]")
+    else:
+        src.error(4, "'__all__'", "'Field %r is not defined' % key")
+
+    if schema_class._required_fields:
+        src.add(1, "if validate_required_constraint:")
+        for field_name in sorted(schema_class._required_fields):
+            key = repr(field_name)
+            src.add(2, "if transformed.get(%s) is None and (errors is None or %s not in errors):" % (key, key))
+            src.error(3, key, repr("Required field is missing"))
+
+    src.add(1, "if errors and with_errors:")
+    src.add(2, "raise ValidationError(errors)")
+    src.add(1, "return transformed")
+
+    exec "\n".join(src.lines) in src.namespace
+    return src.namespace["deserialize"]
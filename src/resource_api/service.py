@@ -2,18 +2,34 @@
 Copyright (c) 2014-2015 F-Secure
 See LICENSE for details
 """
+import json
+import hashlib
 from abc import ABCMeta, abstractmethod
 
+from .interfaces import Link
 from .resource import RootResourceCollection
+from .link import LinkToOne, RootLinkCollection
+from .traversal import Traversal
+from .identity_map import IdentityMap
+from .user_cache import UserCache
 from .errors import DeclarationError, ResourceDeclarationError, DoesNotExist
 
 
 class EntryPoint(object):
-    """ Represents user specific means of access to object interface. """
+    """ Represents user specific means of access to object interface.
 
-    def __init__(self, service, user):
+    If the entry point is created with an identity map, results of *exists*, *get_data* and some of *can_* calls are
+    memoized per resource/link and PK for the lifetime of the entry point. Changes done via the same entry point drop
+    the respective results. Changes done elsewhere are NOT visible - so the entry point is supposed to be short living
+    (e.g. one per HTTP request).
+    """
+
+    def __init__(self, service, user, identity_map=False):
         self._service = service
         self._user = user
+        self._identity_map = IdentityMap() if identity_map else None
+        self._target_collections = {}
+        self._links = {}
 
     @property
     def user(self):
@@ -24,6 +40,32 @@ class EntryPoint(object):
         if not self._service._ready:
             raise DeclarationError("service's setup method was not called")
 
+    def _get_collection(self, res):
+        if self._identity_map is not None:
+            res = self._identity_map.wrap(res)
+        return RootResourceCollection(self, res)
+
+    def _get_target_collection(self, resource_name):
+        """ Returns a collection shared by all the links pointing to the resource. It must not be iterated. """
+        rval = self._target_collections.get(resource_name)
+        if rval is None:
+            rval = self._target_collections[resource_name] = self.get_resource_by_name(resource_name)
+        return rval
+
+    def _get_link(self, res, name):
+        """ Returns (link collection class, target collection, forward link, backward link) tuple for the link """
+        key = (res.get_name(), name)
+        rval = self._links.get(key)
+        if rval is None:
+            meta = self._service._links_meta[key[0]].get(name)
+            if meta is None:
+                raise DoesNotExist("Link %r is not defined" % name)
+            link_class, target_name = meta
+            forward_link_instance = getattr(res.links, name)
+            rval = self._links[key] = (link_class, self._get_target_collection(target_name), forward_link_instance,
+                                       forward_link_instance.related_link)
+        return rval
+
     def get_resource_by_name(self, resource_name):
         """
         resource_name (string)
@@ -41,7 +83,7 @@ class EntryPoint(object):
             res = self._service._resources_py[resource_name]
         else:
             raise DoesNotExist("Resource %s does not exist" % resource_name)
-        return RootResourceCollection(self, res)
+        return self._get_collection(res)
 
     def get_resource(self, resource_class):
         """
@@ -54,7 +96,27 @@ class EntryPoint(object):
         name = resource_class.get_name()
         if name not in self._service._resources_py:
             raise DoesNotExist("Resource %s does not exist" % name)
-        return RootResourceCollection(self, self._service._resources_py[resource_class.get_name()])
+        return self._get_collection(self._service._resources_py[name])
+
+    def traverse(self, resource_name, pks=None):
+        """ Returns a :class:`traversal <resource_api.traversal.Traversal>` starting at the given resources
+
+        resource_name (string)
+            the same as for *get_resource_by_name*
+        pks (None|list = None)
+            PKs of the resources to start from, all the resources of the collection are used by default
+
+        >>> entry_point.traverse("school.Student", ["foo@bar.com"]).follow("courses").follow("teacher").data()
+        [{"name": "Zeus", ...}, ...]
+        """
+        collection = self.get_resource_by_name(resource_name)
+        if pks is None:
+            return Traversal(self, collection._res, [item.pk for item in collection])
+        items = collection._get_many(list(pks))
+        for item in items:
+            if isinstance(item, DoesNotExist):
+                raise item
+        return Traversal(self, collection._res, [item.pk for item in items])
 
 
 class Service(object):
@@ -63,14 +125,32 @@ class Service(object):
     Service has to be subclassed in order to implement usecase specific *_get_context* and *_get_user* methods.
 
     NOTE: do not override any of the public methods - it may cause framework's misbehavior.
+
+    use_identity_map (bool = False)
+        If *True* entry points are created with an identity map by default
+    user_cache_size (int = 0)
+        Maximum number of user objects returned by *_get_user* to be cached. The cache is disabled if the size is 0.
+    user_cache_ttl (float = 60)
+        Number of seconds for which cached user objects remain valid
+    user_cache_keys (None|tuple = None)
+        Keys of the data passed to *get_entry_point* (e.g. HTTP headers) identifying the user. The cache is keyed with
+        a digest of their values. If None - all the data is used.
     """
     __metaclass__ = ABCMeta
 
+    use_identity_map = False
+    user_cache_size = 0
+    user_cache_ttl = 60
+    user_cache_keys = None
+
     def __init__(self):
         self._resources = {}
         self._resources_py = {}
         self._python_to_human = {}
         self._ready = False
+        self._links_meta = {}
+        self._schema_bytes = self._schema_etag = None
+        self._user_cache = UserCache(self.user_cache_size, self.user_cache_ttl) if self.user_cache_size else None
 
     @abstractmethod
     def _get_context(self):
@@ -88,6 +168,14 @@ class Service(object):
         methods of various resources for authorization purposes.
         """
 
+    def _get_user_cache_key(self, data):
+        """ Returns a digest of the parts of data that identify the user """
+        if self.user_cache_keys is None:
+            items = sorted((key.lower(), value) for key, value in data.items())
+        else:
+            items = [data.get(key) for key in self.user_cache_keys]
+        return hashlib.sha1(json.dumps(items)).hexdigest()
+
     def _connect_links(self, inst):
         for field_name, field in inst.iter_links():
             cls = inst.__class__
@@ -130,6 +218,7 @@ class Service(object):
         name = name or resource.get_name()
         self._python_to_human[resource.get_name()] = name
         self._resources[name] = self._resources_py[resource.get_name()] = resource(self._get_context())
+        self._schema_bytes = self._schema_etag = None
 
     def setup(self):
         """ Finalizes resource registration.
@@ -143,6 +232,11 @@ class Service(object):
                 setattr(inst.links, field_name, field(self._get_context()))
         for inst in self._resources_py.values():
             self._connect_links(inst)
+        for name, inst in self._resources_py.iteritems():
+            self._links_meta[name] = dict(
+                (link_name, (LinkToOne if link.cardinality == Link.cardinalities.ONE else RootLinkCollection,
+                             link.target))
+                for link_name, link in inst.iter_links())
         self._ready = True
 
     def get_schema(self, human=True):
@@ -162,10 +256,42 @@ class Service(object):
             new_rval[self._python_to_human[key]] = value
         return new_rval
 
-    def get_entry_point(self, data):
+    def get_schema_bytes(self):
+        """ Returns JSON encoded human schema of all registered resources.
+
+        The schema is encoded once and then reused until another resource is registered.
+        """
+        if self._schema_bytes is None:
+            self._schema_bytes = json.dumps(self.get_schema())
+            self._schema_etag = hashlib.sha1(self._schema_bytes).hexdigest()
+        return self._schema_bytes
+
+    def get_schema_etag(self):
+        """ Returns a hash of the encoded schema suitable for caching purposes """
+        self.get_schema_bytes()
+        return self._schema_etag
+
+    def get_entry_point(self, data, identity_map=None):
         """ Returns :class:`entry point <resource_api.service.EntryPoint>`
 
         data
             intormation to be used to construct user object via *_get_user* method
+        identity_map (None|bool = None)
+            if True the entry point memoizes DAL calls, by default *use_identity_map* attribute is used
+        """
+        if identity_map is None:
+            identity_map = self.use_identity_map
+        if self._user_cache is None:
+            user = self._get_user(data)
+        else:
+            user = self._user_cache.get(self._get_user_cache_key(data), lambda: self._get_user(data))
+        return EntryPoint(self, user, identity_map)
+
+    def invalidate_user(self, data=None):
+        """ Drops cached user object so that it is resolved via *_get_user* again
+
+        data
+            the same information as the one passed to *get_entry_point*, if None - all cached users are dropped
         """
-        return EntryPoint(self, self._get_user(data))
+        if self._user_cache is not None:
+            self._user_cache.invalidate(None if data is None else self._get_user_cache_key(data))
@@ -0,0 +1,92 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+"""
+from .errors import AuthorizationError, MultipleFound
+from .interfaces import Link as BaseLink
+from .resource import ResourceCollection, ResourceInstance
+
+
+class Traversal(object):
+    """ A set of resources reached by following links from a set of source resources
+
+    Each hop is resolved for all the resources of the set at once via
+    :meth:`Link.can_get_uris_many <resource_api.interfaces.Link.can_get_uris_many>` and
+    :meth:`Link.get_uris_many <resource_api.interfaces.Link.get_uris_many>`, the links are authorized via
+    :meth:`Link.can_discover_pairs <resource_api.interfaces.Link.can_discover_pairs>`, the targets are deduplicated and
+    authorized via :meth:`Resource.can_discover_many <resource_api.interfaces.Resource.can_discover_many>`.
+
+    >>> teachers = entry_point.traverse("school.Student", ["foo@bar.com"]).follow("courses").follow("teacher")
+    >>> teachers.data()
+    [{"name": "Zeus", ...}, ...]
+
+    The traversal is iterable over :class:`resource instances <resource_api.resource.ResourceInstance>`:
+
+    >>> for teacher in teachers:
+    >>>    ...
+    """
+
+    def __init__(self, entry_point, resource_interface, pks):
+        self._entry_point = entry_point
+        self._res = resource_interface
+        self._pks = pks
+
+    @property
+    def pks(self):
+        """ Returns a list with PKs of the resources in the set """
+        return list(self._pks)
+
+    def __iter__(self):
+        return (ResourceInstance(self._entry_point, self._res, pk) for pk in self._pks)
+
+    def __len__(self):
+        return len(self._pks)
+
+    def follow(self, link_name, params=None):
+        """ Returns a new traversal with the targets of the link
+
+        link_name (string)
+            name of the link defined by the resources of the set
+        params (dict = None)
+            filtering options of the link collections
+        """
+        user = self._entry_point.user
+        _, target_collection, forward, _ = self._entry_point._get_link(self._res, link_name)
+        many = forward.cardinality == BaseLink.cardinalities.MANY
+        if many:
+            if not all(forward.can_get_uris_many(user, self._pks) if self._pks else []):
+                raise AuthorizationError("Fetching link collection is not allowed")
+            params = forward.query_schema.deserialize(params or {}, with_errors=False,
+                                                      validate_required_constraint=False)
+        else:
+            params = None
+        items = []
+        for pk, rel_pks in zip(self._pks, forward.get_uris_many(user, self._pks, params) if self._pks else []):
+            rel_pks = list(rel_pks)
+            if not many and len(rel_pks) > 1:
+                raise MultipleFound("Several instances of a link with cardinality ONE were found")
+            items.extend((pk, rel_pk) for rel_pk in rel_pks)
+        targets, seen = [], set()
+        for (_, rel_pk), allowed in zip(items, forward.can_discover_pairs(user, items) if items else []):
+            if allowed and rel_pk not in seen:
+                seen.add(rel_pk)
+                targets.append(rel_pk)
+        target_res = target_collection._res
+        mask = target_res.can_discover_many(user, targets) if targets else []
+        return Traversal(self._entry_point, target_res, [pk for pk, allowed in zip(targets, mask) if allowed])
+
+    def iter_with_data(self, chunk_size=None, fields=None):
+        """ Iterates over the resources of the set fetching their data in chunks, works the same way as
+        :meth:`ResourceCollection.iter_with_data <resource_api.resource.ResourceCollection.iter_with_data>`
+        """
+        collection = ResourceCollection(self._entry_point, self._res)
+        collection._items = self._pks
+        return collection.iter_with_data(chunk_size, fields)
+
+    def data(self, fields=None):
+        """ Returns a list with the data of all the resources in the set
+
+        fields (None|list of strings = None)
+            if defined, only these fields are fetched
+        """
+        return [item.get_data(fields) for item in self.iter_with_data(fields=fields)]
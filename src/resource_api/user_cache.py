@@ -0,0 +1,51 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+"""
+import time
+import threading
+from collections import OrderedDict
+
+
+class UserCache(object):
+    """ Thread safe LRU cache of user objects with a time to live
+
+    size (int)
+        maximum number of users kept in the cache, the least recently used ones are dropped first
+    ttl (float)
+        number of seconds after which a cached user has to be resolved again
+    """
+
+    def __init__(self, size, ttl, clock=time.time):
+        self._size = size
+        self._ttl = ttl
+        self._clock = clock
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, compute):
+        """ Returns the user cached under the key. If there is no valid user - it is computed and cached. """
+        now = self._clock()
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None and item[1] > now:
+                self._items[key] = item
+                return item[0]
+        user = compute()  # the lock is not held so that slow resolution does not block other users
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (user, now + self._ttl)
+            while len(self._items) > self._size:
+                self._items.popitem(last=False)
+        return user
+
+    def invalidate(self, key=None):
+        """ Drops the user cached under the key or all the users if key is None """
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
@@ -6,9 +6,12 @@ import json
 import logging
 import traceback
 from functools import partial
+from itertools import chain, islice
 
+from werkzeug.test import EnvironBuilder
 from werkzeug.wrappers import Request, Response
 from werkzeug.routing import Map, Rule
+from werkzeug.wsgi import get_path_info
 from werkzeug import exceptions as http_exceptions
 
 from resource_api.schema import ListField, ObjectField
@@ -33,12 +36,55 @@ def _preprocess_query(schema, args):
     return rval
 
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 1000
+
+
+class Stream(object):
+    """ Endpoint result holding items that may be encoded and sent to the client one by one """
+
+    def __init__(self, items):
+        self.items = items
+
+
+def _encode_stream(items, ndjson):
+    """ Yields a JSON array or newline delimited JSON of the items in chunks of STREAM_CHUNK_SIZE items """
+    items = iter(items)
+    chunks = iter(lambda: list(islice(items, STREAM_CHUNK_SIZE)), [])
+    if ndjson:
+        for chunk in chunks:
+            yield "".join(json.dumps(item) + "\n" for item in chunk)
+        return
+    prefix = "["
+    for chunk in chunks:
+        yield prefix + ", ".join(json.dumps(item) for item in chunk)
+        prefix = ", "
+    yield "]" if prefix == ", " else "[]"
+
+
+ENTRY_POINT_ENVIRON_KEY = "resource_api.entry_point"
+
+
+def _get_entry_point(request, service):
+    """ Returns the entry point of the request, the user is resolved only once per request """
+    entry_point = request.environ.get(ENTRY_POINT_ENVIRON_KEY)
+    if entry_point is None:
+        entry_point = request.environ[ENTRY_POINT_ENVIRON_KEY] = service.get_entry_point(request.headers)
+    return entry_point
+
+
 def get_schema(request, service):
-    return service.get_schema(), 200
+    etag = service.get_schema_etag()
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(service.get_schema_bytes(), mimetype="application/json")
+    resp.set_etag(etag)
+    return resp
 
 
 def _get_col(request, service, resource_name):
-    res = service.get_entry_point(request.headers).get_resource_by_name(resource_name)
+    res = _get_entry_point(request, service).get_resource_by_name(resource_name)
     args = _preprocess_query(res._res.query_schema, request.args)
     if args:
         return res.filter(params=args)
@@ -46,41 +92,102 @@ def _get_col(request, service, resource_name):
         return res
 
 
+DEFAULT_PAGE_SIZE = 100
+
+
+def _include_data(args):
+    include = args.get("include")
+    if include not in (None, "data"):
+        raise errors.ValidationError("include must be 'data'")
+    return include == "data"
+
+
+def _get_fields(args):
+    fields = args.get("fields")
+    if fields is None:
+        return None
+    return [field for field in fields.split(",") if field]
+
+
+def _serialize_resource(item, include_data, fields=None):
+    if include_data:
+        return {"@pk": item.serialize_pk(), "data": item.serialize(fields)}
+    return item.serialize_pk()
+
+
+def _get_page(collection, args):
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise errors.ValidationError("limit must be an integer")
+    include_data, fields = _include_data(args), _get_fields(args)
+    items, cursor = collection.page(limit, args.get("cursor"))
+    return {"items": [_serialize_resource(item, include_data, fields) for item in items], "next_cursor": cursor}
+
+
 def get_resource_collection(request, service, resource_name):
-    return _get_col(request, service, resource_name).serialize(), 200
+    col = _get_col(request, service, resource_name)
+    if "limit" in request.args or "cursor" in request.args:
+        return _get_page(col, request.args), 200
+    if _include_data(request.args):
+        fields = _get_fields(request.args)
+        return Stream(_serialize_resource(item, True, fields) for item in col.iter_with_data(fields=fields)), 200
+    return Stream(item.serialize_pk() for item in col), 200
 
 
 def get_resource_collection_count(request, service, resource_name):
     return _get_col(request, service, resource_name).count(), 200
 
 
+def traverse_resource_collection(request, service, resource_name):
+    path = [link_name for link_name in request.args.get("path", "").split(",") if link_name]
+    if not path:
+        raise errors.ValidationError("path must be a comma separated list of link names")
+    pks = request.args.get("pks")
+    if pks is not None:
+        try:
+            pks = json.loads(pks)
+        except ValueError:
+            pks = None
+        if not isinstance(pks, list):
+            raise errors.ValidationError("pks must be a JSON list")
+    traversal = _get_entry_point(request, service).traverse(resource_name, pks)
+    for link_name in path:
+        traversal = traversal.follow(link_name)
+    if _include_data(request.args):
+        fields = _get_fields(request.args)
+        return Stream(_serialize_resource(item, True, fields)
+                      for item in traversal.iter_with_data(fields=fields)), 200
+    return Stream(item.serialize_pk() for item in traversal), 200
+
+
 def get_resource_item(request, service, resource_name, resource_pk):
-    res = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk)
+    res = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk)
     if request.method == "HEAD":
         return None, 200
     else:
-        return res.serialize(), 200
+        return res.serialize(_get_fields(request.args)), 200
 
 
 def delete_resource_item(request, service, resource_name, resource_pk):
-    return service.get_entry_point(request.headers).get_resource_by_name(resource_name)\
+    return _get_entry_point(request, service).get_resource_by_name(resource_name)\
                   .get(resource_pk).delete(), 204
 
 
 def update_resource_item(request, service, resource_name, resource_pk):
-    return service.get_entry_point(request.headers).get_resource_by_name(resource_name)\
+    return _get_entry_point(request, service).get_resource_by_name(resource_name)\
                   .get(resource_pk).update(json.loads(request.data)), 204
 
 
 def create_resource_item(request, service, resource_name):
     resource_data = json.loads(request.data)
     links = resource_data.pop("@links", {})
-    return service.get_entry_point(request.headers).get_resource_by_name(resource_name)\
+    return _get_entry_point(request, service).get_resource_by_name(resource_name)\
                   .create(resource_data, links).serialize_pk(), 201
 
 
 def _get_link_col(request, service, resource_name, resource_pk, link_name):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     lnk = getattr(links, link_name)
     args = _preprocess_query(lnk._forward_link_instance.query_schema, request.args)
     if args:
@@ -90,7 +197,11 @@ def _get_link_col(request, service, resource_name, resource_pk, link_name):
 
 
 def get_link_to_many_collection(request, service, resource_name, resource_pk, link_name):
-    return _get_link_col(request, service, resource_name, resource_pk, link_name).serialize(), 200
+    col = _get_link_col(request, service, resource_name, resource_pk, link_name)
+    if _include_data(request.args):
+        return Stream({"@target": item.target.serialize_pk(), "data": item.serialize()}
+                      for item in col.iter_with_data()), 200
+    return Stream(item.target.serialize_pk() for item in col), 200
 
 
 def get_link_to_many_collection_count(request, service, resource_name, resource_pk, link_name):
@@ -98,17 +209,17 @@ def get_link_to_many_collection_count(request, service, resource_name, resource_
 
 
 def update_link_to_many_item(request, service, resource_name, resource_pk, link_name, target_pk):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     return getattr(links, link_name).get(target_pk).update(json.loads(request.data)), 204
 
 
 def delete_link_to_many_item(request, service, resource_name, resource_pk, link_name, target_pk):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     return getattr(links, link_name).get(target_pk).delete(), 204
 
 
 def get_link_to_many_item_data(request, service, resource_name, resource_pk, link_name, target_pk):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     link = getattr(links, link_name).get(target_pk)
     if request.method == "HEAD":
         return None, 200
@@ -117,32 +228,32 @@ def get_link_to_many_item_data(request, service, resource_name, resource_pk, lin
 
 
 def create_link_to_many_item(request, service, resource_name, resource_pk, link_name):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     link_item = getattr(links, link_name).create(json.loads(request.data))
     return link_item.target.serialize_pk(), 201
 
 
 def set_link_to_one(request, service, resource_name, resource_pk, link_name):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     link = getattr(links, link_name)
     link.set(json.loads(request.data))
     return link.item.target.serialize_pk(), 201
 
 
 def delete_link_to_one(request, service, resource_name, resource_pk, link_name):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     getattr(links, link_name).item.delete()
     return None, 204
 
 
 def update_link_to_one(request, service, resource_name, resource_pk, link_name):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     getattr(links, link_name).item.update(json.loads(request.data))
     return None, 204
 
 
 def get_link_to_one_data(request, service, resource_name, resource_pk, link_name):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     link = getattr(links, link_name).item
     if request.method == "HEAD":
         return None, 200
@@ -151,104 +262,285 @@ def get_link_to_one_data(request, service, resource_name, resource_pk, link_name
 
 
 def get_link_to_one_target(request, service, resource_name, resource_pk, link_name, redirect=False):
-    links = service.get_entry_point(request.headers).get_resource_by_name(resource_name).get(resource_pk).links
+    links = _get_entry_point(request, service).get_resource_by_name(resource_name).get(resource_pk).links
     link = getattr(links, link_name)
     return link.item.target.serialize_pk(), 200
 
 
-class Application(object):
-    """ Plain WSGI application for Resource API service
+class WerkzeugRouter(object):
+    """ Matches requests against werkzeug's rule map """
 
-    service (:class:`Service's <resource_api.service.Service>` subclass instance)
-        Service to generate HTTP interface for
-    debug (bool)
-        If True 500 responses will include detailed traceback describing the error
+    def __init__(self):
+        self._rules = []
+        self._map = None
+
+    def add(self, url, method, endpoint):
+        self._rules.append(Rule(url, methods=[method], endpoint=endpoint))
+
+    def build(self):
+        """ Builds the rule map, MUST be called once all the rules are added and before any request is matched """
+        self._map = Map(self._rules)
+
+    def match(self, environ):
+        return self._map.bind_to_environ(environ).match()
+
+
+class DictRouter(object):
+    """ Matches requests by walking nested dicts keyed with URL segments
+
+    Each segment of a rule is either a static string (e.g. resource name) or a variable that may be followed by a static
+    suffix (e.g. "<target_pk>:data"). Static segments are looked up in a dict, so the time needed to match a request
+    does not depend on the number of registered resources and links.
     """
 
-    def __init__(self, service, debug=False):
-        service.setup()
-        url_map = []
+    def __init__(self):
+        self._root = self._node()
+
+    @staticmethod
+    def _node():
+        return {"static": {}, "variables": [], "methods": {}}
+
+    def add(self, url, method, endpoint):
+        node = self._root
+        for segment in url.split("/")[1:]:
+            if not segment.startswith("<"):
+                node = node["static"].setdefault(segment, self._node())
+                continue
+            end = segment.index(">")
+            key = (segment[1:end], segment[end + 1:])
+            for var_key, child in node["variables"]:
+                if var_key == key:
+                    node = child
+                    break
+            else:
+                child = self._node()
+                node["variables"].append((key, child))
+                node["variables"].sort(key=lambda item: -len(item[0][1]))
+                node = child
+        node["methods"][method] = endpoint
+
+    def build(self):
+        """ The lookup structures are complete as soon as the rules are added """
+
+    def _find(self, node, segments, index, params):
+        if index == len(segments):
+            return node if node["methods"] else None
+        segment = segments[index]
+        child = node["static"].get(segment)
+        if child is not None:
+            found = self._find(child, segments, index + 1, params)
+            if found is not None:
+                return found
+        for (name, suffix), child in node["variables"]:
+            if len(segment) > len(suffix) and segment.endswith(suffix):
+                params[name] = segment[:len(segment) - len(suffix)]
+                found = self._find(child, segments, index + 1, params)
+                if found is not None:
+                    return found
+                del params[name]
+        return None
+
+    def match(self, environ):
+        params = {}
+        node = self._find(self._root, get_path_info(environ).split("/")[1:], 0, params)
+        if node is None:
+            raise http_exceptions.NotFound()
+        methods = node["methods"]
+        method = environ.get("REQUEST_METHOD", "GET").upper()
+        if method == "HEAD" and method not in methods:
+            method = "GET"
+        if method not in methods:
+            raise http_exceptions.MethodNotAllowed(valid_methods=sorted(methods))
+        return methods[method], params
+
+
+def _add_rules(router, service, schema):
+
+    def rule(url, endpoint, method="GET", **kwargs):
+        router.add(url, method, partial(endpoint, **kwargs))
+
+    rule("/", get_schema, service=service, method="OPTIONS")
+
+    for resource_name, resource_meta in schema.iteritems():
+        kwargs = dict(resource_name=resource_name, service=service)
+
+        rule("/%s" % resource_name, get_resource_collection, **kwargs)
+        rule("/%s:count" % resource_name, get_resource_collection_count, **kwargs)
+        rule("/%s:traverse" % resource_name, traverse_resource_collection, **kwargs)
+        rule("/%s" % resource_name, create_resource_item, "POST", **kwargs)
+        rule("/%s/<resource_pk>" % resource_name, get_resource_item, "GET", **kwargs)
+        rule("/%s/<resource_pk>" % resource_name, delete_resource_item, "DELETE", **kwargs)
+        rule("/%s/<resource_pk>" % resource_name, update_resource_item, "PATCH", **kwargs)
+
+        for link_name, link_meta in resource_meta.get("links", {}).iteritems():
+            kwargs = dict(kwargs)
+            kwargs["link_name"] = link_name
+            base_url = "/%s/<resource_pk>/%s" % (resource_name, link_name)
+
+            def link_rule(endpoint, suffix="", method="GET"):
+                rule(base_url + suffix, endpoint, method, **kwargs)
+
+            if link_meta.get("cardinality", "MANY") == "ONE":
+                link_rule(get_link_to_one_target, suffix="/item")
+                link_rule(set_link_to_one, method="PUT")
+                link_rule(get_link_to_one_data, suffix="/item:data")
+                link_rule(update_link_to_one, method="PATCH", suffix="/item")
+                link_rule(delete_link_to_one, method="DELETE", suffix="/item")
+            else:
+                link_rule(get_link_to_many_collection)
+                link_rule(get_link_to_many_collection_count, suffix=":count")
+                link_rule(create_link_to_many_item, method="POST")
+                link_rule(update_link_to_many_item, method="PATCH", suffix="/<target_pk>")
+                link_rule(delete_link_to_many_item, method="DELETE", suffix="/<target_pk>")
+                link_rule(get_link_to_many_item_data, suffix="/<target_pk>:data")
 
-        def rule(url, endpoint, method="GET", **kwargs):
-            url_map.append(Rule(url, methods=[method], endpoint=partial(endpoint, **kwargs)))
 
-        rule("/", get_schema, service=service, method="OPTIONS")
+MAX_BATCH_SIZE = 100
 
-        schema = service.get_schema()
 
-        for resource_name, resource_meta in schema.iteritems():
-            kwargs = dict(resource_name=resource_name, service=service)
+def _get_batch_operations(data):
+    try:
+        operations = json.loads(data)
+    except ValueError:
+        raise errors.ValidationError("Batch has to be a JSON list")
+    if not isinstance(operations, list):
+        raise errors.ValidationError("Batch has to be a JSON list")
+    if len(operations) > MAX_BATCH_SIZE:
+        raise errors.ValidationError("Batch can not have more than %d operations" % MAX_BATCH_SIZE)
+    for operation in operations:
+        if not isinstance(operation, dict) or not isinstance(operation.get("method"), basestring) or \
+           not isinstance(operation.get("url"), basestring) or not operation["url"].startswith("/"):
+            raise errors.ValidationError("Each operation has to be a dict with method and url starting with /")
+    return operations
 
-            rule("/%s" % resource_name, get_resource_collection, **kwargs)
-            rule("/%s:count" % resource_name, get_resource_collection_count, **kwargs)
-            rule("/%s" % resource_name, create_resource_item, "POST", **kwargs)
-            rule("/%s/<resource_pk>" % resource_name, get_resource_item, "GET", **kwargs)
-            rule("/%s/<resource_pk>" % resource_name, delete_resource_item, "DELETE", **kwargs)
-            rule("/%s/<resource_pk>" % resource_name, update_resource_item, "PATCH", **kwargs)
 
-            for link_name, link_meta in resource_meta.get("links", {}).iteritems():
-                kwargs = dict(kwargs)
-                kwargs["link_name"] = link_name
-                base_url = "/%s/<resource_pk>/%s" % (resource_name, link_name)
+def _get_batch_query(params):
+    """ Encodes list and dict parameters as JSON the same way as they are sent in standalone requests """
+    if not isinstance(params, dict):
+        return params
+    return dict((key, json.dumps(value) if isinstance(value, (list, dict)) else value)
+                for key, value in params.iteritems())
 
-                def link_rule(endpoint, suffix="", method="GET"):
-                    rule(base_url + suffix, endpoint, method, **kwargs)
 
-                if link_meta.get("cardinality", "MANY") == "ONE":
-                    link_rule(get_link_to_one_target, suffix="/item")
-                    link_rule(set_link_to_one, method="PUT")
-                    link_rule(get_link_to_one_data, suffix="/item:data")
-                    link_rule(update_link_to_one, method="PATCH", suffix="/item")
-                    link_rule(delete_link_to_one, method="DELETE", suffix="/item")
-                else:
-                    link_rule(get_link_to_many_collection)
-                    link_rule(get_link_to_many_collection_count, suffix=":count")
-                    link_rule(create_link_to_many_item, method="POST")
-                    link_rule(update_link_to_many_item, method="PATCH", suffix="/<target_pk>")
-                    link_rule(delete_link_to_many_item, method="DELETE", suffix="/<target_pk>")
-                    link_rule(get_link_to_many_item_data, suffix="/<target_pk>:data")
-
-        self._url_map = Map(url_map)
-        self._debug = debug
+class Application(object):
+    """ Plain WSGI application for Resource API service
 
-    def __call__(self, environ, start_response):
+    service (:class:`Service's <resource_api.service.Service>` subclass instance)
+        Service to generate HTTP interface for
+    debug (bool)
+        If True 500 responses will include detailed traceback describing the error
+    router (class = WerkzeugRouter)
+        Class used to match requests to respective operations. :class:`DictRouter` is faster for services with many
+        resources and links.
+    streaming (bool = False)
+        If True collections are encoded and sent to the client while they are being iterated instead of being loaded
+        into memory first. Collections are always streamed as newline delimited JSON if the client prefers
+        *application/x-ndjson* via Accept header.
+
+    NOTE: once streaming has started errors can not be reported via status codes anymore - the response is just cut.
+
+    The application does not keep any request specific state, so it can be served by a multithreaded WSGI server to
+    prevent slow DAL calls from blocking other requests - e.g.
+    :func:`make_server <resource_api_http.server.make_server>` which processes requests in a bounded pool of worker
+    threads. The resources and links have to be thread safe in this case.
+
+    Several operations can be executed via a single **POST /:batch** request. Its body is a list of operations, each
+    of them is a dict with *method*, *url* and optional *params* (query string) and *data* (request body) keys. The
+    operations are executed in order using the same entry point - a failure does not stop the following operations.
+    The response is a list with *status* and *body* of every operation.
+    """
 
-        def _resp(data, status):
-            resp = Response(json.dumps(data, indent=2 if self._debug else None), mimetype="application/json")
-            if data is None:
-                status = 204
-            resp.status_code = status
-            return resp(environ, start_response)
+    def __init__(self, service, debug=False, router=WerkzeugRouter, streaming=False):
+        service.setup()
+        service.get_schema_bytes()
+        self._service = service
+        self._router = router()
+        _add_rules(self._router, service, service.get_schema())
+        self._router.add("/:batch", "POST", self._batch)
+        self._router.build()
+        self._debug = debug
+        self._streaming = streaming
+
+    def _stream(self, request, items, status):
+        ndjson = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+        if not ndjson and not self._streaming:
+            return list(items), status
+        items = iter(items)
+        head = list(islice(items, 1))  # errors related to the first item are still reported via status codes
+        resp = Response(_encode_stream(chain(head, items), ndjson),
+                        mimetype=NDJSON_MIMETYPE if ndjson else "application/json")
+        resp.status_code = status
+        return resp
+
+    def _batch(self, request):
+        if ENTRY_POINT_ENVIRON_KEY in request.environ:
+            raise errors.ValidationError("Batches can not be nested")
+        operations = _get_batch_operations(request.data)
+        entry_point = _get_entry_point(request, self._service)
+        rval = []
+        for operation in operations:
+            data = operation.get("data")
+            environ = EnvironBuilder(path=operation["url"], method=operation["method"].upper(),
+                                     query_string=_get_batch_query(operation.get("params")),
+                                     content_type="application/json",
+                                     data=None if data is None else json.dumps(data)).get_environ()
+            environ[ENTRY_POINT_ENVIRON_KEY] = entry_point
+            body, status = self._execute(environ, streaming=False)
+            rval.append({"status": 204 if body is None else status, "body": body})
+        return rval, 200
+
+    def _server_error(self):
+        logging.exception("Internal server error")
+        if self._debug:
+            return traceback.format_exc(), 500
+        else:
+            return "Server error", 500
 
+    def _execute(self, environ, streaming=True):
+        """ Returns either a Response or a tuple with JSONizable data and status code """
         try:
-            urls = self._url_map.bind_to_environ(environ)
-            endpoint, params = urls.match()
-            rval = endpoint(Request(environ), **params)
-            if isinstance(rval, Response):
-                return rval(environ, start_response)
-            else:
-                rval, status = rval
-                return _resp(rval, status)
+            endpoint, params = self._router.match(environ)
+            request = Request(environ)
+            rval = endpoint(request, **params)
+            if isinstance(rval, tuple) and isinstance(rval[0], Stream):
+                if streaming:
+                    rval = self._stream(request, rval[0].items, rval[1])
+                else:
+                    rval = list(rval[0].items), rval[1]
+            if isinstance(rval, Response) and not streaming:
+                rval = (json.loads(rval.get_data()) if rval.get_data() else None), rval.status_code
+            return rval
         except errors.MultipleFound, e:
-            return _resp(e.message, 500)  # this is actually a server problem
+            return e.message, 500  # this is actually a server problem
         except errors.ValidationError, e:
-            return _resp(e.message, 400)
+            return e.message, 400
         except errors.DoesNotExist, e:
-            return _resp(e.message, 404)
+            return e.message, 404
         except errors.DataConflictError, e:
-            return _resp(e.message, 409)
+            return e.message, 409
         except errors.Forbidden, e:
-            return _resp(e.message, 405)
+            return e.message, 405
         except errors.AuthorizationError, e:
-            return _resp(e.message, 403)
+            return e.message, 403
         except NotImplementedError, e:
-            return _resp(e.message, 501)
+            return e.message, 501
         except http_exceptions.HTTPException, e:
-            return _resp(e.description, e.code)
+            return e.description, e.code
         except Exception, e:
-            logging.exception("Internal server error")
-            if self._debug:
-                msg = traceback.format_exc()
-            else:
-                msg = "Server error"
-            return _resp(msg, 500)
+            return self._server_error()
+
+    def __call__(self, environ, start_response):
+        rval = self._execute(environ)
+        if isinstance(rval, Response):
+            return rval(environ, start_response)
+        data, status = rval
+        try:
+            body = json.dumps(data, indent=2 if self._debug else None)
+        except Exception:
+            data, status = self._server_error()
+            body = json.dumps(data, indent=2 if self._debug else None)
+        resp = Response(body, mimetype="application/json")
+        if data is None:
+            status = 204
+        resp.status_code = status
+        return resp(environ, start_response)
@@ -0,0 +1,55 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+"""
+from multiprocessing.pool import ThreadPool
+
+from werkzeug.serving import BaseWSGIServer
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """ WSGI server that handles requests in a bounded pool of worker threads
+
+    Unlike the thread-per-request werkzeug server, at most *workers* requests are processed at the same time - the rest
+    are queued until a worker becomes free. A slow DAL call blocks only the worker that issued it.
+
+    workers (int)
+        number of requests processed concurrently
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, workers=10, **kwargs):
+        BaseWSGIServer.__init__(self, host, port, app, **kwargs)
+        self._pool = ThreadPool(workers)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def process_request(self, request, client_address):
+        self._pool.apply_async(self._process_request, (request, client_address))
+
+    def server_close(self):
+        BaseWSGIServer.server_close(self)
+        self._pool.close()
+        self._pool.join()
+
+
+def make_server(application, host="127.0.0.1", port=5000, workers=10):
+    """ Returns :class:`PooledWSGIServer` serving the application, call *serve_forever()* to start it
+
+    application (:class:`Application <resource_api_http.http.Application>`)
+        WSGI application to serve
+    host (string)
+        interface to bind to
+    port (int)
+        port to bind to, 0 picks a free one
+    workers (int)
+        number of requests processed concurrently
+    """
+    return PooledWSGIServer(host, port, application, workers=workers)
@@ -2,9 +2,11 @@
 Copyright (c) 2014-2015 F-Secure
 See LICENSE for details
 """
+from multiprocessing.pool import ThreadPool
+
 from resource_api.errors import DoesNotExist
 
-from .transport import HttpClient, JsonClient
+from .transport import HttpClient, JsonClient, EXCEPTION_MAP
 
 
 class Client(object):
@@ -17,7 +19,7 @@ class Client(object):
     """
 
     @classmethod
-    def create(cls, base_url, auth_headers=None):
+    def create(cls, base_url, auth_headers=None, pool_size=None):
         """ Instanciates the client
 
         base_url (string)
@@ -25,8 +27,11 @@ class Client(object):
         auth_headers (dict || None)
             Dictionary with fields that are later on used to
             `construct user object <resource_api.service.Service_get_user>`
+        pool_size (int || None)
+            Maximum number of connections kept open to the server, should not be lower than concurrency of
+            :meth:`prefetch <resource_api_http_client.client.Client.prefetch>`
         """
-        http_client = HttpClient(auth_headers=auth_headers)
+        http_client = HttpClient(auth_headers=auth_headers, pool_size=pool_size)
         transport_client = JsonClient(http_client)
         return cls(base_url, transport_client)
 
@@ -56,6 +61,73 @@ class Client(object):
             self._schema = self._open(method="OPTIONS")
         return self._schema
 
+    def batch(self):
+        """ Returns a :class:`Batch <resource_api_http_client.client.Batch>` to queue several operations that are
+        later on sent to the server via a single HTTP request
+        """
+        return Batch(self)
+
+    def traverse(self, resource_name, path, pks=None):
+        """ Follows the links of the path starting at the given resources via a single request and returns a list of
+        :class:`resource instances <resource_api_http_client.client.ResourceInstance>` reached by the last link
+
+        >>> client.traverse("school.Student", ["courses", "teacher"], pks=["foo@bar.com"])
+        [<ResourceInstance object>, ...]
+
+        resource_name (string)
+            E.g.: "school.Student"
+        path (list of strings)
+            names of the links to follow
+        pks (None|list = None)
+            PKs of the resources to start from, all the resources are used by default
+        """
+        target_name = resource_name
+        for link_name in path:
+            links = self.schema.get(target_name, {}).get("links", {})
+            if link_name not in links:
+                raise DoesNotExist("Link %r is not defined" % link_name)
+            target_name = links[link_name]["target"]
+        params = {"path": ",".join(path)}
+        if pks is not None:
+            params["pks"] = list(pks)
+        pks = self._open(resource_name + ":traverse", params=params)
+        return [ResourceInstance(self, target_name, pk) for pk in pks]
+
+    def prefetch(self, instances, concurrency=10):
+        """ Fetches data of several :class:`resource instances <resource_api_http_client.client.ResourceInstance>`
+        concurrently so that their *data* properties do not perform any further requests
+
+        >>> students = client.get_resource_by_name("school.Student")[:50]
+        >>> client.prefetch(students, concurrency=5)
+        >>> [student.data for student in students]
+
+        NOTE: all the threads share the *requests.Session* of the client, its connection pool should be big enough
+        (see *pool_size* argument of :meth:`create <resource_api_http_client.client.Client.create>`).
+
+        instances (list)
+            resource instances to fetch the data for, the ones that already have full data are skipped
+        concurrency (int = 10)
+            maximum number of requests executed at the same time
+        """
+        instances = [instance for instance in instances if instance._data is None or instance._fields is not None]
+        if not instances:
+            return
+        self.schema  # fetched once before any of the threads need it
+        if len(instances) == 1 or concurrency < 2:
+            for instance in instances:
+                instance._fetch_data()
+            return
+        pool = ThreadPool(min(concurrency, len(instances)))
+        try:
+            pool.map(lambda instance: instance._fetch_data(), instances)
+        except Exception:
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
+
     def get_resource_by_name(self, resource_name):
         """
         resource_name (string)
@@ -68,6 +140,62 @@ class Client(object):
         return RootResourceCollection(self, resource_name)
 
 
+class Batch(object):
+    """ Queue of operations executed by the server in order using the same entry point.
+
+    >>> batch = client.batch()
+    >>> batch.add("POST", "school.Student", data={"email": "foo@bar.com", ...})
+    0
+    >>> batch.add("POST", "school.Student/foo@bar.com/courses", data={"@target": "Maths"})
+    1
+    >>> batch.add("GET", "school.Student", params={"include": "data"})
+    2
+    >>> batch.flush()
+    ["foo@bar.com", None, [{"@pk": "foo@bar.com", "data": {...}}]]
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._operations = []
+
+    def add(self, method, url, params=None, data=None):
+        """ Queues an operation and returns its index within the results of
+        :meth:`flush <resource_api_http_client.client.Batch.flush>`
+
+        method (string)
+            HTTP method of the operation
+        url (string)
+            URL of the operation relative to the service URL (e.g.: "school.Student/foo@bar.com")
+        params (dict = None)
+            query string of the operation
+        data (None|dict|list = None)
+            body of the operation
+        """
+        operation = {"method": method, "url": "/" + url.lstrip("/")}
+        if params:
+            operation["params"] = params
+        if data is not None:
+            operation["data"] = data
+        self._operations.append(operation)
+        return len(self._operations) - 1
+
+    def flush(self):
+        """ Sends all queued operations to the server and returns a list with one entry per operation: either the
+        body of the response or an error instance (e.g. :class:`DoesNotExist <resource_api.errors.DoesNotExist>`)
+        """
+        operations, self._operations = self._operations, []
+        if not operations:
+            return []
+        rval = []
+        for result in self._client._open(":batch", method="POST", data=operations):
+            status, body = result["status"], result["body"]
+            if status > 199 and status < 400:
+                rval.append(body)
+            else:
+                rval.append(EXCEPTION_MAP.get(status, Exception)(body))
+        return rval
+
+
 class ResourceCollection(object):
     """
     The entity that represents a pile of resources.
@@ -111,6 +239,8 @@ class ResourceCollection(object):
 
     def __getitem__(self, key):
         self.__iter__()
+        if isinstance(key, slice):
+            return [self._get(pk) for pk in self._items[key]]
         pk = self._items[key]
         return self._get(pk)
 
@@ -138,6 +268,53 @@ class ResourceCollection(object):
         """
         return self._client._open(self._base_url + ":count", params=self._params)
 
+    def page(self, limit, cursor=None):
+        """ Returns a tuple: a list with at most *limit* items and a cursor to fetch the next page with or None if it is
+        the last page
+
+        >>> students, cursor = student_collection.page(50)
+        >>> more_students, cursor = student_collection.page(50, cursor)
+        """
+        params = dict(self._params)
+        params["limit"] = limit
+        if cursor is not None:
+            params["cursor"] = cursor
+        rval = self._client._open(self._base_url, params=params)
+        return [self._get(pk) for pk in rval["items"]], rval["next_cursor"]
+
+    def iter_pages(self, page_size=100):
+        """ Iterates over the collection fetching *page_size* items per HTTP request when they are needed
+
+        >>> for student in student_collection.iter_pages(page_size=500):
+        >>>    ...
+        """
+        cursor = None
+        while True:
+            items, cursor = self.page(page_size, cursor)
+            for item in items:
+                yield item
+            if cursor is None:
+                break
+
+    def iter_with_data(self, fields=None):
+        """ Iterates over the collection fetching the data of all items via a single HTTP request
+
+        fields (None|list of strings = None)
+            if defined, only these fields are fetched and are available via
+            :meth:`get_data <resource_api_http_client.client.ResourceInstance.get_data>` of the items
+
+        >>> for student in student_collection.iter_with_data():
+        >>>    print student.data["first_name"]
+        """
+        params = dict(self._params)
+        params["include"] = "data"
+        if fields is not None:
+            params["fields"] = ",".join(fields)
+            fields = frozenset(fields)
+        schema = {"data": self._client.schema[self._name]["schema"]}
+        for item in self._client._open(self._base_url, params=params, schema=schema):
+            yield ResourceInstance(self._client, self._name, item["@pk"], item["data"], fields)
+
     def next(self):
         return self._get(self._iter_items.next())
 
@@ -172,12 +349,13 @@ class ResourceInstance(object):
     :class:`resource collections <resource_api_http_client.client.ResourceCollection>`.
     """
 
-    def __init__(self, client, name, pk, data=None):
+    def __init__(self, client, name, pk, data=None, fields=None):
         self._client = client
         self._name = name
         self._pk = pk
         self._links = None
         self._data = data
+        self._fields = fields
         self._url = self._name + "/" + str(self._pk)
 
     @property
@@ -193,7 +371,8 @@ class ResourceInstance(object):
     def links(self):
         """ Returns a :class:`link holder <resource_api_http_client.client.LinkHolder>` """
         if self._links is None:
-            self._links = LinkHolder(self._client, self._url, self._client.schema[self._name].get("links", {}))
+            self._links = LinkHolder(self._client, self._url, self._name,
+                                     self._client.schema[self._name].get("links", {}))
         return self._links
 
     @property
@@ -203,10 +382,27 @@ class ResourceInstance(object):
         >>> student.data
         {"first_name": "John", "last_name": "Smith", "email": "foo@bar.com", "birthday": "1987-02-21T22:22:22"}
         """
-        if self._data is None:
-            self._data = self._client._open(self._url, schema=self._client.schema[self._name]["schema"])
+        if self._data is None or self._fields is not None:
+            self._fetch_data()
         return self._data
 
+    def _fetch_data(self):
+        self._data = self._client._open(self._url, schema=self._client.schema[self._name]["schema"])
+        self._fields = None
+
+    def get_data(self, fields=None):
+        """ Returns data associated with the resource restricted to the specified fields
+
+        >>> student.get_data(fields=["first_name"])
+        {"first_name": "John"}
+        """
+        if fields is None:
+            return self.data
+        if self._data is not None and (self._fields is None or self._fields.issuperset(fields)):
+            return dict((key, self._data[key]) for key in fields if key in self._data)
+        return self._client._open(self._url, params={"fields": ",".join(fields)},
+                                  schema=self._client.schema[self._name]["schema"])
+
     def update(self, data):
         """ Changes specified fields of the resource
 
@@ -215,7 +411,7 @@ class ResourceInstance(object):
         {"first_name": "Looper", "last_name": "Smith", "email": "foo@bar.com", "birthday": "1987-02-21T22:22:22"}
         """
         self._client._open(self._url, method="PATCH", data=data)
-        self._data = None
+        self._data = self._fields = None
 
     def delete(self):
         """ Removes the resource
@@ -244,9 +440,10 @@ class LinkHolder(object):
     <LinkToOne object>
     """
 
-    def __init__(self, client, url, schema):
+    def __init__(self, client, url, resource_name, schema):
         self._client = client
         self._url = url
+        self._resource_name = resource_name
         self._schema = schema
 
     def __getattr__(self, link_name):
@@ -257,7 +454,7 @@ class LinkHolder(object):
         if link.get("cardinality", "MANY") == "ONE":
             return LinkToOne(self._client, self._url, target_name, link_name)
         else:
-            return RootLinkCollection(self._client, self._url, target_name, link_name)
+            return RootLinkCollection(self._client, self._url, self._resource_name, target_name, link_name)
 
 
 class LinkInstance(object):
@@ -375,8 +572,9 @@ class LinkCollection(object):
     >>> link = student_courses[15]
     """
 
-    def __init__(self, client, base_url, target_name, name, params=None):
+    def __init__(self, client, base_url, resource_name, target_name, name, params=None):
         self._client = client
+        self._resource_name = resource_name
         self._target_name = target_name
         self._target_pk = None
         self._base_url = base_url
@@ -399,7 +597,8 @@ class LinkCollection(object):
         new_params.update(self._params)
         if params:
             new_params.update(params)
-        return LinkCollection(self._client, self._base_url, self._target_name, self._name, new_params)
+        return LinkCollection(self._client, self._base_url, self._resource_name, self._target_name, self._name,
+                              new_params)
 
     def __iter__(self):
         if self._items is None:
@@ -409,6 +608,8 @@ class LinkCollection(object):
 
     def __getitem__(self, key):
         self.__iter__()
+        if isinstance(key, slice):
+            return [self._get(pk) for pk in self._items[key]]
         pk = self._items[key]
         return self._get(pk)
 
@@ -436,6 +637,18 @@ class LinkCollection(object):
         """
         return self._client._open(self._url + ":count", params=self._params)
 
+    def iter_with_data(self):
+        """ Iterates over the collection fetching the data of all links via a single HTTP request
+
+        >>> for link in student.links.courses.iter_with_data():
+        >>>    print link.data["grade"]
+        """
+        params = dict(self._params)
+        params["include"] = "data"
+        schema = {"data": self._client.schema[self._resource_name]["links"][self._name]["schema"]}
+        for item in self._client._open(self._url, params=params, schema=schema):
+            yield LinkInstance(self._client, self._url, self._target_name, item["@target"], item["data"])
+
     def next(self):
         return self._get(self._iter_items.next())
 
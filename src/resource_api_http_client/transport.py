@@ -5,11 +5,11 @@ See LICENSE for details
 import json
 
 from datetime import datetime
-import isodate
 
 import requests
 
 from resource_api.errors import ValidationError, DoesNotExist, AuthorizationError, DataConflictError, Forbidden
+from resource_api.isotime import parse_datetime
 
 
 EXCEPTION_MAP = {
@@ -30,9 +30,13 @@ class Response(object):
 
 class HttpClient(object):
 
-    def __init__(self, auth_headers=None, session=None):
+    def __init__(self, auth_headers=None, session=None, pool_size=None):
         self._auth_headers = auth_headers or {}
         self._session = session or requests.Session()
+        if pool_size:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
 
     def open(self, path, method="GET", content_type="application/json", query_string=None, data=None):
         headers = {'content-type': content_type}
@@ -80,7 +84,7 @@ class JSONDecoder(json.JSONDecoder):
             if isinstance(value, dict):
                 py_dict[name] = self._decode_dict(value, field_schema)
             elif field_schema.get("type") == "datetime":
-                py_dict[name] = isodate.parse_datetime(value)
+                py_dict[name] = parse_datetime(value)
             else:
                 py_dict[name] = value
 
@@ -5,6 +5,7 @@ See LICENSE for details
 from resource_api.errors import AuthorizationError, DoesNotExist, ValidationError
 
 from .base_test import BaseTest
+from .sample_app.resources import Source, Target
 
 
 # NOTE: here we access self.entry_point._user to avoid test code duplication. In real life it should not be done.
@@ -16,6 +17,11 @@ class ResourceAuthorizationTest(BaseTest):
         self.entry_point._user = {"source": {"view": False}}
         self.assertRaises(AuthorizationError, lambda: self.src.get(1).data)
 
+    def test_get_some_fields_not_authorized(self):
+        self.entry_point._user = {"source": {"view": False}}
+        self.assertRaises(AuthorizationError, self.src.get(1).get_data, ["extra"])
+        self.assertRaises(AuthorizationError, self.src.fetch_data, fields=["extra"])
+
     def test_delete_not_authorized(self):
         self.entry_point._user = {"source": {"delete": False}}
         self.assertRaises(AuthorizationError, self.src.get(1).delete)
@@ -24,6 +30,21 @@ class ResourceAuthorizationTest(BaseTest):
         self.entry_point._user = {"source": {"create": False}}
         self.assertRaises(AuthorizationError, self.src.create, {"pk": 3, "extra": "foo"})
 
+    def test_create_many_not_authorized(self):
+        self.entry_point._user = {"source": {"create": False}}
+        rval = self.src.create_many([{"pk": 3, "extra": "foo"}])
+        self.assertIsInstance(rval[0], AuthorizationError)
+
+    def test_update_all_not_authorized(self):
+        self.entry_point._user = {"source": {"update": False}}
+        self.assertRaises(AuthorizationError, self.src.update_all, {"extra": "Neo"})
+        self.assertEqual(self.storage.get(Source.get_name(), 1)["extra"], "foo")
+
+    def test_delete_all_not_authorized(self):
+        self.entry_point._user = {"source": {"delete": False}}
+        self.assertRaises(AuthorizationError, self.src.delete_all)
+        self.assertEqual(len(self.src), 2)
+
     def test_update_not_authorized(self):
         self.entry_point._user = {"source": {"update": False}}
         self.assertRaises(AuthorizationError, self.src.get(1).update, {"extra": "Neo"})
@@ -40,6 +61,11 @@ class ResourceAuthorizationTest(BaseTest):
         self.entry_point._user = {"source": {"discover": False}}
         self.assertRaises(DoesNotExist, lambda: self.src.get(1).data)
 
+    def test_fetch_data_uses_batch_check(self):
+        src = self.srv._resources_py[Source.get_name()]
+        src.can_get_data_many = lambda user, pks, data: [pk != 2 for pk in pks]
+        self.assertRaises(AuthorizationError, self.src.fetch_data)
+
 
 class LinkToManyAuthorizationTest(BaseTest):
 
@@ -48,6 +74,11 @@ class LinkToManyAuthorizationTest(BaseTest):
         self.assertRaises(AuthorizationError, lambda: self.src.get(1).links.targets.get(1).data)
         self.assertRaises(AuthorizationError, lambda: self.target.get(1).links.sources.get(1).data)
 
+    def test_iter_with_data_not_authorized(self):
+        self.entry_point._user = {"link": {"view": False}}
+        self.assertRaises(AuthorizationError, list, self.src.get(1).links.targets.iter_with_data())
+        self.assertRaises(AuthorizationError, list, self.target.get(1).links.sources.iter_with_data())
+
     def test_delete_not_authorized(self):
         self.entry_point._user = {"link": {"delete": False}}
         self.assertRaises(AuthorizationError, self.src.get(1).links.targets.get(1).delete)
@@ -77,6 +108,19 @@ class LinkToManyAuthorizationTest(BaseTest):
         self.assertEqual(list(self.target.get(1).links.sources), [None])
         self.assertEqual(list(self.src.get(1).links.targets), [None])
 
+    def test_collection_discoverability_is_checked_in_chunks(self):
+        calls = []
+        link = self.srv._resources_py[Source.get_name()].links.targets
+        target = self.srv._resources_py[Target.get_name()]
+        link.can_discover_many = lambda user, pk, rel_pks: calls.append(("link", pk, rel_pks)) or [True, False, True]
+        target.can_discover_many = lambda user, pks: calls.append(("target", pks)) or [False, True]
+        self.storage.set((1, link.get_name()), 2, {})
+        self.storage.set((1, link.get_name()), 3, {})
+        collection = self.src.get(1).links.targets
+        collection.chunk_size = 3
+        self.assertEqual([lnk and lnk.target.pk for lnk in collection], [None, None, 3])
+        self.assertEqual(calls, [("link", 1, [1, 2, 3]), ("target", [1, 3])])
+
     def test_get_non_discoverable_link(self):
         self.entry_point._user = {"link": {"discover": False}}
         self.assertRaises(DoesNotExist, self.src.get(1).links.targets.get, 1)
@@ -3,6 +3,7 @@ Copyright (c) 2014-2015 F-Secure
 See LICENSE for details
 """
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 import unittest
 
 import mock
@@ -18,7 +19,7 @@ from werkzeug.wrappers import Response
 
 from resource_api_http_client.client import(Client, RootResourceCollection, ResourceInstance, ResourceCollection,
                                             LinkHolder, LinkToOne, RootLinkCollection, LinkCollection, LinkInstance)
-from resource_api_http_client.transport import JsonClient
+from resource_api_http_client.transport import JsonClient, HttpClient as RequestsClient
 
 from .base_test import BaseTest
 from .simulators import TestService, TestResource, TestLink
@@ -60,6 +61,13 @@ class JsonTest(unittest.TestCase):
     def test_not_allowed(self):
         self._validate_exception(Forbidden, 405)
 
+    def test_pool_size(self):
+        session = mock.Mock()
+        RequestsClient(session=session, pool_size=20)
+        adapter = session.mount.call_args[0][1]
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertEqual([call[0][0] for call in session.mount.call_args_list], ["http://", "https://"])
+
 
 class BaseClientTest(BaseTest):
 
@@ -84,6 +92,63 @@ class ResourceTest(BaseClientTest):
         self.assertTrue(item.pk, 1)
         self.assertEqual({"pk": 1, "more_data": "bla", "extra": "foo"}, item.data)
 
+    def test_get_some_fields(self):
+        item = self.client.get_resource_by_name("foo.Source").get(1)
+        self.assertEqual(item.get_data(fields=["extra"]), {"extra": "foo"})
+        self.assertRaises(ValidationError, item.get_data, ["foo"])
+
+    def test_iter_with_some_fields(self):
+        items = list(self.client.get_resource_by_name("foo.Source").iter_with_data(fields=["extra"]))
+        call_count = len(self.srv.storage.call_log)
+        self.assertEqual(items[0].get_data(["extra"]), {"extra": "foo"})
+        self.assertEqual(len(self.srv.storage.call_log), call_count)
+        self.assertEqual(items[0].data, {"pk": 1, "more_data": "bla", "extra": "foo"})
+
+    def test_traverse(self):
+        items = self.client.traverse("foo.Source", ["targets", "sources"], pks=[1])
+        self.assertEqual([(item._name, item.pk) for item in items], [("foo.Source", 1)])
+        self.assertEqual([item.pk for item in self.client.traverse("foo.Source", ["the_target"])], [2])
+        self.assertRaises(DoesNotExist, self.client.traverse, "foo.Source", ["foo"])
+
+    def test_prefetch(self):
+        items = list(self.client.get_resource_by_name("foo.Source"))
+        self.client.prefetch(items, concurrency=2)
+        call_count = len(self.srv.storage.call_log)
+        self.assertEqual([item.data["pk"] for item in items], [1, 2])
+        self.assertEqual(len(self.srv.storage.call_log), call_count)
+        self.client.prefetch(items)
+        self.assertEqual(len(self.srv.storage.call_log), call_count)
+
+    def test_prefetch_error(self):
+        items = [self.client.get_resource_by_name("foo.Source")[0], ResourceInstance(self.client, "foo.Source", 5)]
+        self.assertRaises(DoesNotExist, self.client.prefetch, items)
+
+    def test_prefetch_stops_worker_threads(self):
+        pools = []
+        with mock.patch("resource_api_http_client.client.ThreadPool",
+                        side_effect=lambda *args: pools.append(ThreadPool(*args)) or pools[-1]):
+            self.client.prefetch(list(self.client.get_resource_by_name("foo.Source")))
+            self.assertRaises(DoesNotExist, self.client.prefetch, [ResourceInstance(self.client, "foo.Source", 5)] * 2)
+        self.assertEqual(len(pools), 2)
+        self.assertFalse([worker for pool in pools for worker in pool._pool if worker.is_alive()])
+
+    def test_batch(self):
+        batch = self.client.batch()
+        self.assertEqual(batch.add("POST", "foo.Source", data={"pk": 3, "extra": "bar"}), 0)
+        batch.add("PATCH", "/foo.Source/3", data={"extra": "baz"})
+        batch.add("GET", "foo.Source/3", params={"fields": "extra"})
+        batch.add("GET", "foo.Source/5")
+        rval = batch.flush()
+        self.assertEqual(rval[:3], [3, None, {"extra": "baz"}])
+        self.assertIsInstance(rval[3], DoesNotExist)
+        self.assertEqual(batch.flush(), [])
+
+    def test_batch_traverse(self):
+        batch = self.client.batch()
+        batch.add("GET", "foo.Source:traverse", params={"pks": [1], "path": "targets"})
+        self.assertEqual(batch.flush(), [[1]])
+        self.assertEqual([item.pk for item in self.client.traverse("foo.Source", ["targets"], pks=[1])], [1])
+
     def test_get_count(self):
         count = self.client.get_resource_by_name("foo.Source").count()
         self.assertEqual(count, 2)
@@ -100,10 +165,34 @@ class ResourceTest(BaseClientTest):
         items = list(collection)
         self.assertIsInstance(items[0], ResourceInstance)
 
+    def test_page(self):
+        items, cursor = self.client.get_resource_by_name("foo.Source").page(1)
+        self.assertEqual([item.pk for item in items], [1])
+        self.assertEqual(cursor, "1")
+
+    def test_iter_pages(self):
+        items = list(self.client.get_resource_by_name("foo.Source").iter_pages(page_size=1))
+        self.assertEqual([item.pk for item in items], [1, 2])
+
+    def test_iter_with_data(self):
+        items = list(self.client.get_resource_by_name("foo.Source").iter_with_data())
+        call_count = len(self.srv.storage.call_log)
+        self.assertEqual([item.pk for item in items], [1, 2])
+        self.assertEqual(items[0].data, {"pk": 1, "extra": "foo", "more_data": "bla"})
+        self.assertEqual(len(self.srv.storage.call_log), call_count)
+
     def test_access_by_index(self):
         item = self.client.get_resource_by_name("foo.Source")[0]
         self.assertIsInstance(item, ResourceInstance)
 
+    def test_access_by_slice(self):
+        items = self.client.get_resource_by_name("foo.Source")[:2]
+        self.assertEqual([item.pk for item in items], [1, 2])
+        self.client.prefetch(items)
+        call_count = len(self.srv.storage.call_log)
+        self.assertEqual([item.data["pk"] for item in items], [1, 2])
+        self.assertEqual(len(self.srv.storage.call_log), call_count)
+
     def test_create(self):
         data = dict(pk=5, extra="Foo", more_data="Bar")
         item = self.client.get_resource_by_name("foo.Source").create(data)
@@ -173,10 +262,26 @@ class LinkToManytest(BaseClientTest):
         link = links[0]
         self.assertIsInstance(link, LinkInstance)
 
+    def test_iter_with_data(self):
+        links = list(self.client.get_resource_by_name("foo.Source")[0].links.targets.iter_with_data())
+        call_count = len(self.srv.storage.call_log)
+        self.assertEqual([link.target.pk for link in links], [1])
+        self.assertEqual(links[0].data, {"extra": "foo", "more_data": "bla"})
+        self.assertEqual(len(self.srv.storage.call_log), call_count)
+
+    def test_iter_with_data_of_slave_link(self):
+        links = list(self.client.get_resource_by_name("foo.Target").get(1).links.sources.filter().iter_with_data())
+        self.assertEqual([link.target.pk for link in links], [1])
+        self.assertEqual(links[0].data, {"extra": "foo", "more_data": "bla"})
+
     def test_access_by_index(self):
         link = self.client.get_resource_by_name("foo.Source")[0].links.targets[0]
         self.assertIsInstance(link, LinkInstance)
 
+    def test_access_by_slice(self):
+        links = self.client.get_resource_by_name("foo.Source")[0].links.targets[:1]
+        self.assertEqual([link.target.pk for link in links], [1])
+
     def test_get_count(self):
         links = self.client.get_resource_by_name("foo.Source")[0].links.targets
         count = links.count()
@@ -261,3 +366,11 @@ class SerializationTest(unittest.TestCase):
         item = collection.get(1)
         link = item.links.targets.get(1)
         self.assertEqual({"datetieme_field": datetime(1, 1, 1, 1, 1, 1)}, link.data)
+
+    def test_iter_resources_with_datetime(self):
+        items = list(self.client.get_resource_by_name("foo.Source").iter_with_data())
+        self.assertEqual({"pk": 1, "datetieme_field": datetime(1, 1, 1, 1, 1, 1)}, items[0].data)
+
+    def test_iter_links_with_datetime(self):
+        links = list(self.client.get_resource_by_name("foo.Source").get(1).links.targets.iter_with_data())
+        self.assertEqual({"datetieme_field": datetime(1, 1, 1, 1, 1, 1)}, links[0].data)
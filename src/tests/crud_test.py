@@ -7,7 +7,8 @@ import unittest
 from resource_api.resource import RootResourceCollection, ResourceCollection
 from resource_api.link import RootLinkCollection, LinkCollection
 from resource_api import schema
-from resource_api.errors import DoesNotExist, ValidationError, DataConflictError, Forbidden, MultipleFound
+from resource_api.errors import (
+    DoesNotExist, ValidationError, DataConflictError, Forbidden, MultipleFound, AuthorizationError)
 
 from .simulators import TestResource, TestService, TestLink
 from .sample_app.resources import Target, Source
@@ -30,12 +31,35 @@ class RegistryTest(BaseTest):
     def test_get_unknown_link(self):
         self.assertRaisesRegexp(DoesNotExist, "Link 'smafg' is not defined", lambda: self.src.get(1).links.smafg)
 
+    def test_link_accessors_are_resolved_once(self):
+        first = self.src.get(1).links.targets
+        self.entry_point.get_resource_by_name = None  # any further lookup would fail
+        second = self.src.get(2).links.targets
+        self.assertIs(second._target_collection, first._target_collection)
+        self.assertIsNot(second, first)
+        self.assertEqual([lnk.target.pk for lnk in first], [1])
+        self.assertEqual(list(second), [])
+
 
 class ResourceTest(BaseTest):
 
     def test_get(self):
         self.assertEqual(self.src.get(1).data, {"pk": 1, "extra": "foo", "more_data": "bla"})
 
+    def test_get_some_fields(self):
+        self.assertEqual(self.src.get(1).get_data(fields=["extra", "pk"]), {"pk": 1, "extra": "foo"})
+        self.assertEqual(self.src.get(1).serialize(fields=["extra"]), {"extra": "foo"})
+
+    def test_get_unknown_fields(self):
+        self.assertRaisesRegexp(ValidationError, "Unknown fields: foo", self.src.get(1).get_data, ["foo", "pk"])
+
+    def test_get_some_fields_uses_partial_hook(self):
+        calls = []
+        src = self.srv._resources_py[Source.get_name()]
+        src.get_partial_data = lambda user, pk, fields: calls.append((pk, fields)) or {"pk": pk, "extra": "bar"}
+        self.assertEqual(self.src.get(1).get_data(fields=["extra"]), {"extra": "bar"})
+        self.assertEqual(calls, [(1, frozenset(["extra"]))])
+
     def test_update(self):
         item = self.src.get(1)
         item.update({"extra": "bar"})
@@ -53,10 +77,115 @@ class ResourceTest(BaseTest):
         item.delete()
         self.assertRaises(DoesNotExist, self.src.get, 1)
 
+    def _enable_bulk_delete(self, resource):
+        for name, _ in resource.iter_links():
+            getattr(resource.links, name).bulk_delete = True
+
+    def test_delete_with_bulk_link_removal(self):
+        src = self.srv._resources_py[Source.get_name()]
+        self._enable_bulk_delete(src)
+        self.src.get(1).delete()
+        forward = set((1, getattr(src.links, name).get_name()) for name, _ in src.iter_links())
+        self.assertEqual([call for call in self.storage.call_log if call[0] == "DELETE" and call[1] in forward], [])
+        self.assertEqual(len([call for call in self.storage.call_log if call[0] == "DELETE_ALL"]), 3)
+        self.assertEqual(self.target.get(1).links.sources.count(), 0)
+        self.assertEqual(self.target.get(2).links.the_sources.count(), 0)
+        self.assertRaises(DoesNotExist, lambda: self.target.get(2).links.one_to_one_source.item)
+
+    def test_delete_slave_with_bulk_link_removal(self):
+        self._enable_bulk_delete(self.srv._resources_py[Target.get_name()])
+        calls = []
+        targets = self.srv._resources_py[Source.get_name()].links.targets
+        targets.delete_reverse_many = lambda user, pks, rel_pk: calls.append((pks, rel_pk))
+        self.target.get(1).delete()
+        self.assertEqual(calls, [([1], 1)])
+        self.assertRaises(DoesNotExist, self.target.get, 1)
+
     def test_create(self):
         self.src.create({"pk": 3, "extra": "foo"})
         self.assertEqual(self.src.get(3).data, {"pk": 3, "extra": "foo"})
 
+    def test_create_many(self):
+        rval = self.src.create_many([
+            {"pk": 3, "extra": "foo", "@links": {"targets": [{"@target": 1}]}},
+            {"extra": "foo"},
+            {"pk": 1},
+            {"pk": 4},
+            {"pk": 4},
+            {"pk": 5, "@links": {"targets": [{"@target": 6}]}},
+            "NON DICT"
+        ])
+        self.assertEqual(rval[0].pk, 3)
+        self.assertEqual(self.src.get(3).links.targets.get(1).target.pk, 1)
+        self.assertIsInstance(rval[1], ValidationError)
+        self.assertEqual(rval[1].message, {"pk": ["Required field is missing"]})
+        self.assertIsInstance(rval[2], DataConflictError)
+        self.assertEqual(self.src.get(4).data, {"pk": 4})
+        self.assertIsInstance(rval[4], DataConflictError)
+        self.assertIsInstance(rval[5], ValidationError)
+        self.assertIsInstance(rval[6], ValidationError)
+        self.assertRaises(DoesNotExist, self.src.get, 5)
+
+    def test_create_many_uses_bulk_hook(self):
+        calls = []
+        src = self.srv._resources_py[Source.get_name()]
+        src.create_many = lambda user, items: calls.append(items) or [pk for pk, _ in items]
+        self.src.create_many([{"pk": 3}, {"pk": 4}])
+        self.assertEqual(calls, [[(3, {"pk": 3}), (4, {"pk": 4})]])
+
+    def test_create_many_groups_links_by_type(self):
+        calls = []
+        links = self.srv._resources_py[Source.get_name()].links
+        for name in ["targets", "the_target"]:
+            for hook in ["can_create_many", "create_many"]:
+                func = getattr(getattr(links, name), hook)
+                setattr(getattr(links, name), hook,
+                        lambda user, items, name=name, hook=hook, func=func: calls.append((name, hook)) or
+                        func(user, items))
+        rval = self.src.create_many([
+            {"pk": 3, "@links": {"targets": [{"@target": 1}, {"@target": 2}], "the_target": {"@target": 1}}},
+            {"pk": 4, "@links": {"targets": [{"@target": 1}, {"@target": 1}]}},
+            {"pk": 5, "@links": {"targets": [{"@target": 2}], "the_target": {"@target": 2}}}])
+        self.assertEqual(sorted(calls), [("targets", "can_create_many"), ("targets", "create_many"),
+                                         ("the_target", "can_create_many"), ("the_target", "create_many")])
+        self.assertEqual(rval[1].message, "@Link targets: @Element 1: Link already exists")
+        self.assertEqual([lnk.target.pk for lnk in self.src.get(3).links.targets], [1, 2])
+        self.assertEqual(self.src.get(5).links.the_target.item.target.pk, 2)
+        self.assertEqual([lnk.target.pk for lnk in self.target.get(2).links.sources], [3, 5])
+
+    def test_update_all(self):
+        self.assertEqual(self.src.update_all({"extra": "bar"}), 2)
+        self.assertEqual([item["extra"] for item in self.src.fetch_data()], ["bar", "bar"])
+
+    def test_update_all_with_bad_data(self):
+        self.assertRaises(ValidationError, self.src.update_all, {"extra": 1})
+
+    def test_update_all_uses_bulk_hook(self):
+        calls = []
+        src = self.srv._resources_py[Source.get_name()]
+        src.update_many = lambda user, pks, data: calls.append((pks, data))
+        self.src.update_all({"extra": "bar"})
+        self.assertEqual(calls, [([1, 2], {"extra": "bar"})])
+
+    def test_delete_all(self):
+        self.assertEqual(self.src.delete_all(), 2)
+        self.assertEqual(self.src.count(), 0)
+        self.assertEqual(len(self.target.get(1).links.sources), 0)
+        self.assertRaises(DoesNotExist, lambda: self.target.get(2).links.one_to_one_source.item)
+
+    def test_delete_all_clears_links_in_bulk(self):
+        calls = []
+        links = self.srv._resources_py[Source.get_name()].links
+        for name in ["targets", "the_target", "one_to_one_target"]:
+            delete_many = getattr(links, name).delete_many
+            getattr(links, name).delete_many = \
+                lambda user, items, name=name, delete_many=delete_many: calls.append((name, items)) or \
+                delete_many(user, items)
+        self.src.delete_all()
+        self.assertEqual(sorted(calls), [("one_to_one_target", [(1, 2)]), ("targets", [(1, 1)]),
+                                         ("the_target", [(1, 2)])])
+        self.assertEqual(len(self.target.get(1).links.sources), 0)
+
     def test_create_readonly_with_required_and_defaults(self):
 
         class CustomResource(TestResource):
@@ -76,6 +205,45 @@ class ResourceTest(BaseTest):
     def test_get_from_iteration(self):
         self.assertEqual(self.src[0].data, {"pk": 1, "extra": "foo", "more_data": "bla"})
 
+    def test_page(self):
+        self.storage.set(Source.get_name(), 3, {"pk": 3})
+        items, cursor = self.src.page(2)
+        self.assertEqual([item.pk for item in items], [1, 2])
+        items, cursor = self.src.page(2, cursor)
+        self.assertEqual([item.pk for item in items], [3])
+        self.assertIsNone(cursor)
+
+    def test_page_with_invalid_cursor(self):
+        self.assertRaisesRegexp(ValidationError, "Invalid cursor", self.src.page, 2, "foo")
+
+    def test_slice(self):
+        self.assertEqual([item.pk for item in self.src[1:]], [2])
+        self.assertEqual([item.pk for item in self.src[0:1]], [1])
+        self.assertEqual([item.pk for item in self.src[-1:]], [2])
+
+    def test_slice_uses_get_uris_page(self):
+        calls = []
+        src = self.srv._resources_py[Source.get_name()]
+
+        def get_uris_page(user, params, limit, offset, cursor=None):
+            calls.append((limit, offset))
+            return [2], None
+
+        src.get_uris_page = get_uris_page
+        self.assertEqual([item.pk for item in self.src[5:10]], [2])
+        self.assertEqual(calls, [(5, 5)])
+
+    def test_index_uses_get_uris_page(self):
+        calls = []
+        src = self.srv._resources_py[Source.get_name()]
+        get_uris_page = src.get_uris_page
+        src.get_uris_page = lambda user, params, limit, offset, cursor=None: calls.append((limit, offset)) or \
+            get_uris_page(user, params, limit, offset, cursor)
+        self.assertEqual(self.src[1].pk, 2)
+        self.assertRaises(IndexError, lambda: self.src[2])
+        self.assertEqual(calls, [(1, 1), (1, 2)])
+        self.assertEqual(self.src[-1].pk, 2)
+
     def test_get_non_existent(self):
         self.assertRaisesRegexp(DoesNotExist, "does not exist", self.src.get, 3)
 
@@ -94,6 +262,51 @@ class ResourceTest(BaseTest):
                                 {"pk": 1, "extra": "foo"})
 
 
+class ResourceBatchDataTest(BaseTest):
+
+    def setUp(self):
+        super(ResourceBatchDataTest, self).setUp()
+        src = self.srv._resources_py[Source.get_name()]
+        src.get_data_many = lambda user, pks: self.storage.get_many(Source.get_name(), pks)
+
+    def test_iter_with_data(self):
+        items = list(self.src.iter_with_data())
+        self.assertEqual([item.pk for item in items], [1, 2])
+        self.assertEqual(items[1].data, {"pk": 2, "extra": "foo", "more_data": "bla"})
+
+    def test_fetch_data_in_chunks(self):
+        for pk in range(3, 8):
+            self.storage.set(Source.get_name(), pk, {"pk": pk})
+        self.assertEqual(len(self.src.fetch_data(chunk_size=3)), 7)
+        calls = [call for call in self.storage.call_log if call[0] in ("GET_MANY", "GET")]
+        self.assertEqual(calls, [("GET_MANY", Source.get_name(), [1, 2, 3]),
+                                 ("GET_MANY", Source.get_name(), [4, 5, 6]),
+                                 ("GET_MANY", Source.get_name(), [7])])
+
+    def test_default_get_data_many(self):
+        self.assertEqual(self.target.fetch_data(), [{"pk": 1, "extra": "foo", "more_data": "bla"},
+                                                    {"pk": 2, "extra": "foo", "more_data": "bla"}])
+
+    def test_fetch_data_not_authorized(self):
+        self.entry_point._user = {"source": {"view": False}}
+        self.assertRaises(AuthorizationError, self.src.fetch_data)
+
+    def test_iter_with_some_fields(self):
+        calls = []
+        src = self.srv._resources_py[Source.get_name()]
+        src.get_partial_data_many = lambda user, pks, fields: calls.append((pks, fields)) or [{"extra": "bar"}] * 2
+        items = list(self.src.iter_with_data(fields=["extra"]))
+        self.assertEqual(calls, [([1, 2], frozenset(["extra"]))])
+        self.assertEqual(items[0].get_data(["extra"]), {"extra": "bar"})
+        self.assertEqual(items[0].data, {"pk": 1, "extra": "foo", "more_data": "bla"})
+        self.assertEqual(self.src.fetch_data(fields=["extra"]), [{"extra": "bar"}] * 2)
+
+    def test_update_resets_fetched_data(self):
+        item = list(self.src.iter_with_data())[0]
+        item.update({"extra": "bar"})
+        self.assertEqual(item.data["extra"], "bar")
+
+
 class ResourceRelatedLinkTest(BaseTest):
 
     def test_delete_source(self):
@@ -182,6 +395,69 @@ class LinkToManyTest(BaseTest):
         self.assertRaisesRegexp(ValidationError, "Target: Resource with pk \w{1,2} does not exist.",
                                 self.src.get(1).links.targets.create, {"@target": 3})
 
+    def test_create_many(self):
+        rval = self.src.get(1).links.targets.create_many([
+            {"@target": 2, "extra": "bar"},
+            {"@target": 1},
+            {"@target": 3},
+            {"@target": "one"},
+            {"extra": "bar"},
+            {"@target": 2},
+            "NON DICT"
+        ])
+        self.assertEqual(rval[0].target.pk, 2)
+        self.assertEqual(self.src.get(1).links.targets.get(2).data, {"extra": "bar"})
+        self.assertEqual(self.target.get(2).links.sources.count(), 1)
+        self.assertIsInstance(rval[1], DataConflictError)
+        self.assertIsInstance(rval[2], ValidationError)
+        self.assertRegexpMatches(str(rval[3]), "Target: PK validation failed")
+        self.assertIsInstance(rval[4], ValidationError)
+        self.assertIsInstance(rval[5], DataConflictError)
+        self.assertIsInstance(rval[6], ValidationError)
+
+    def test_create_many_with_bad_data(self):
+        rval = self.src.get(1).links.targets.create_many([{"@target": 2, "extra": 1}])
+        self.assertEqual(rval[0].message.keys(), ["extra"])
+        self.assertRaises(DoesNotExist, self.src.get(1).links.targets.get, 2)
+
+    def test_create_many_uses_bulk_hooks(self):
+        calls = []
+        targets = self.srv._resources_py[Source.get_name()].links.targets
+        sources = self.srv._resources_py[Target.get_name()].links.sources
+        targets.exists_many = lambda user, items: calls.append(("exists", items)) or [False] * len(items)
+        targets.create_many = lambda user, items: calls.append(("targets", items))
+        sources.create_many = lambda user, items: calls.append(("sources", items))
+        self.storage.set(Target.get_name(), 3, {"pk": 3})
+        self.src.get(1).links.targets.create_many([{"@target": 2, "extra": "bar"}, {"@target": 3}])
+        self.assertEqual(calls, [("exists", [(1, 2), (1, 3)]),
+                                 ("targets", [(1, 2, {"extra": "bar"}), (1, 3, {})]),
+                                 ("sources", [(2, 1, None), (3, 1, None)])])
+
+    def test_iter_with_data(self):
+        self.src.get(1).links.targets.create({"@target": 2, "extra": "bar"})
+        items = list(self.src.get(1).links.targets.iter_with_data(chunk_size=1))
+        self.assertEqual([item.target.pk for item in items], [1, 2])
+        self.assertEqual(items[1].data, {"extra": "bar"})
+
+    def test_iter_with_data_uses_bulk_hook(self):
+        calls = []
+        targets = self.srv._resources_py[Source.get_name()].links.targets
+        targets.get_data_many = lambda user, pk, rel_pks: calls.append((pk, rel_pks)) or [{"extra": "bar"}]
+        self.assertEqual([item.data for item in self.src.get(1).links.targets.iter_with_data()], [{"extra": "bar"}])
+        self.assertEqual(calls, [(1, [1])])
+
+    def test_iter_with_data_of_slave_link_uses_bulk_hook(self):
+        calls = []
+        targets = self.srv._resources_py[Source.get_name()].links.targets
+        targets.get_data_reverse_many = lambda user, pks, rel_pk: calls.append((pks, rel_pk)) or [{"extra": "bar"}]
+        items = list(self.target.get(1).links.sources.iter_with_data())
+        self.assertEqual([item.data for item in items], [{"extra": "bar"}])
+        self.assertEqual(calls, [([1], 1)])
+
+    def test_iter_with_data_of_slave_link(self):
+        items = list(self.target.get(1).links.sources.iter_with_data())
+        self.assertEqual(items[0].data, {"extra": "foo", "more_data": "bla"})
+
     def test_filter(self):
         subcol = self.src.get(1).links.targets.filter({"query_param": "Bla", "foo": 666})
         self.assertTrue(isinstance(subcol, LinkCollection))
@@ -208,6 +484,12 @@ class LinkToManyReverseLinkTest(BaseTest):
         self.target.get(1).links.sources.create({"@target": 2})
         self.assertTrue(self.src.get(2).links.targets.count() == 1)
 
+    def test_create_many_related(self):
+        rval = self.target.get(1).links.sources.create_many([{"@target": 2, "extra": "bar"}, {"@target": 1}])
+        self.assertEqual(rval[0].target.pk, 2)
+        self.assertIsInstance(rval[1], DataConflictError)
+        self.assertEqual(self.src.get(2).links.targets.get(1).data, {"extra": "bar"})
+
     def test_delete_related(self):
         self.target.get(1).links.sources[0].delete()
         self.assertTrue(self.src.get(1).links.targets.count() == 0)
@@ -255,6 +537,28 @@ class LinkToOneTest(BaseTest):
         self.storage.set((1, src.links.the_target.get_name()), 1, {"extra": "foo", "more_data": "bla"})
         self.assertRaises(MultipleFound, lambda: self.src.get(1).links.the_target.item)
 
+    def test_item_uses_get_target_hook(self):
+        the_target = self.srv._resources_py[Source.get_name()].links.the_target
+        the_target.get_uris = None
+        the_target.get_target = lambda user, pk: 2 if pk == 1 else None
+        self.assertEqual(self.lnk.item.target.pk, 2)
+        self.assertRaises(DoesNotExist, lambda: self.src.get(2).links.the_target.item)
+
+    def test_set_uses_replace_target_hook(self):
+        calls = []
+        the_target = self.srv._resources_py[Source.get_name()].links.the_target
+        the_target.delete = the_target.create = None
+        the_target.replace_target = lambda *args: calls.append(args[1:])
+        self.lnk.set({"@target": 1, "extra": "bar"})
+        self.assertEqual(calls, [(1, 2, 1, {"extra": "bar"})])
+        self.assertEqual(self.target.get(1).links.the_sources.count(), 1)
+        self.assertEqual(self.target.get(2).links.the_sources.count(), 0)
+
+    def test_set_replaces_data(self):
+        self.lnk.set({"@target": 1, "extra": "bar"})
+        self.assertEqual(self.lnk.item.data, {"extra": "bar"})
+        self.assertEqual(self.target.get(1).links.the_sources.get(1).data, {"extra": "bar"})
+
 
 class LinkToOneReverseLinkTest(BaseTest):
 
@@ -305,6 +609,12 @@ class OneToOneLinkTest(BaseTest):
 class RequiredOneToOneLinkTest(BaseTest):
 
     def test_target_removal_because_of_required_link(self):
+        self._test_target_removal(bulk_delete=False)
+
+    def test_target_removal_with_bulk_delete(self):
+        self._test_target_removal(bulk_delete=True)
+
+    def _test_target_removal(self, bulk_delete):
         class Target(TestResource):
 
             class Schema:
@@ -316,6 +626,8 @@ class RequiredOneToOneLinkTest(BaseTest):
                     related_name = "the_target"
                     cardinality = TestLink.cardinalities.ONE
 
+            Links.the_source.bulk_delete = bulk_delete
+
         class Source(TestResource):
             class Schema:
                 pk = schema.IntegerField(pk=True)
@@ -3,16 +3,21 @@ Copyright (c) 2014-2015 F-Secure
 See LICENSE for details
 """
 import json
+import threading
+from multiprocessing.pool import ThreadPool
 
 import mock
+import requests
 
 from werkzeug.test import Client as BaseClient
 from werkzeug.wrappers import BaseResponse
 
-from resource_api_http.http import Application
+from resource_api_http.http import Application, DictRouter
+from resource_api_http.server import make_server
 from resource_api import errors
 
 from .base_test import BaseTest
+from .sample_app.resources import Source
 
 
 class Client(BaseClient):
@@ -26,9 +31,14 @@ class Client(BaseClient):
 
 class BaseHttpTest(BaseTest):
 
+    router = None
+
     def setUp(self):
         super(BaseHttpTest, self).setUp()
-        self.client = Client(Application(self.srv), BaseResponse)
+        if self.router is None:
+            self.client = Client(Application(self.srv), BaseResponse)
+        else:
+            self.client = Client(Application(self.srv, router=self.router), BaseResponse)
 
     def assertResponse(self, response, data=None, status_code=200):
         self.assertEqual(response.status_code, status_code)
@@ -44,6 +54,14 @@ class HttpTest(BaseHttpTest):
             self.client.options("/"),
             self.srv.get_schema())
 
+    def test_get_schema_not_modified(self):
+        etag = self.client.options("/").headers["ETag"]
+        self.assertEqual(etag, '"%s"' % self.srv.get_schema_etag())
+        resp = self.client.options("/", headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.data, "")
+        self.assertEqual(self.client.options("/", headers={"If-None-Match": '"foo"'}).status_code, 200)
+
     def test_get_resource_collection(self):
         self.assertResponse(
             self.client.get("/foo.Source"),
@@ -54,6 +72,18 @@ class HttpTest(BaseHttpTest):
         self.assertEqual(self.srv.storage.call_log[-1],
                          ("GET_KEYS", "tests.sample_app.resources.Source", {"query_param": u"Foo"}))
 
+    def test_get_resource_collection_page(self):
+        self.assertResponse(
+            self.client.get("/foo.Source?limit=1"),
+            {"items": [1], "next_cursor": "1"})
+        self.assertResponse(
+            self.client.get("/foo.Source?limit=1&cursor=1"),
+            {"items": [2], "next_cursor": None})
+
+    def test_get_resource_collection_page_with_bad_limit(self):
+        self.assertResponse(self.client.get("/foo.Source?limit=foo"), status_code=400)
+        self.assertResponse(self.client.get("/foo.Source?limit=0"), status_code=400)
+
     def test_get_resource_collection_count(self):
         self.assertResponse(
             self.client.get("/foo.Source:count"),
@@ -69,6 +99,70 @@ class HttpTest(BaseHttpTest):
             self.client.get("/foo.Source/1"),
             self.src.get(1).serialize())
 
+    def test_traverse(self):
+        self.assertResponse(self.client.get("/foo.Source:traverse?pks=[1,2]&path=targets,sources"), [1])
+        self.assertResponse(self.client.get("/foo.Source:traverse?path=the_target&include=data&fields=extra"),
+                            [{"@pk": 2, "data": {"extra": "foo"}}])
+        self.assertResponse(self.client.get("/foo.Source:traverse?pks=[1]"), status_code=400)
+        self.assertResponse(self.client.get("/foo.Source:traverse?pks=1&path=targets"), status_code=400)
+        self.assertResponse(self.client.get("/foo.Source:traverse?pks=[5]&path=targets"), status_code=404)
+        self.assertResponse(self.client.get("/foo.Source:traverse?pks=[1]&path=foo"), status_code=404)
+
+    def test_batch(self):
+        resp = self.client.post("/:batch", data=[
+            {"method": "POST", "url": "/foo.Source", "data": {"pk": 3, "extra": "bar"}},
+            {"method": "POST", "url": "/foo.Source/3/targets", "data": {"@target": 2}},
+            {"method": "PATCH", "url": "/foo.Source/3", "data": {"extra": "baz"}},
+            {"method": "GET", "url": "/foo.Source/3", "params": {"fields": "extra"}},
+            {"method": "GET", "url": "/foo.Source/3/targets?include=data"},
+            {"method": "GET", "url": "/foo.Source/5"},
+            {"method": "GET", "url": "/foo.Nonexisting"},
+            {"method": "POST", "url": "/:batch", "data": []}
+        ])
+        self.assertResponse(resp, [
+            {"status": 201, "body": 3},
+            {"status": 201, "body": 2},
+            {"status": 204, "body": None},
+            {"status": 200, "body": {"extra": "baz"}},
+            {"status": 200, "body": [{"@target": 2, "data": {}}]},
+            {"status": 404, "body": mock.ANY},
+            {"status": 404, "body": mock.ANY},
+            {"status": 400, "body": "Batches can not be nested"}
+        ])
+
+    def test_batch_uses_one_entry_point(self):
+        with mock.patch.object(self.srv, "get_entry_point", wraps=self.srv.get_entry_point) as get_entry_point:
+            self.client.post("/:batch", data=[{"method": "GET", "url": "/foo.Source/1"}] * 3)
+        self.assertEqual(get_entry_point.call_count, 1)
+
+    def test_user_is_resolved_once_per_request(self):
+        with mock.patch.object(self.srv, "_get_user", wraps=self.srv._get_user) as get_user:
+            self.client.get("/foo.Source/1/targets/1:data")
+        self.assertEqual(get_user.call_count, 1)
+
+    def test_concurrent_requests(self):
+        urls = ["/foo.Source/%d" % (i % 2 + 1) for i in range(50)]
+        pool = ThreadPool(10)
+        try:
+            responses = pool.map(self.client.get, urls)
+        finally:
+            pool.close()
+        self.assertEqual([json.loads(resp.data)["pk"] for resp in responses], [i % 2 + 1 for i in range(50)])
+
+    def test_bad_batch(self):
+        self.assertResponse(self.client.post("/:batch", data={"method": "GET"}), status_code=400)
+        self.assertResponse(self.client.post("/:batch", data=[{"method": "GET", "url": "foo"}]), status_code=400)
+        self.assertResponse(self.client.post("/:batch", data=[{"method": "GET", "url": "/"}] * 101), status_code=400)
+
+    def test_get_resource_item_fields(self):
+        self.assertResponse(self.client.get("/foo.Source/1?fields=pk,extra"), {"pk": 1, "extra": "foo"})
+        self.assertResponse(self.client.get("/foo.Source/1?fields=foo"), status_code=400)
+
+    def test_get_resource_collection_with_data_fields(self):
+        self.assertResponse(
+            self.client.get("/foo.Source?include=data&fields=extra"),
+            [{"@pk": 1, "data": {"extra": "foo"}}, {"@pk": 2, "data": {"extra": "foo"}}])
+
     def test_delete_resource_item(self):
         self.assertResponse(
             self.client.delete("/foo.Source/1"),
@@ -94,6 +188,24 @@ class HttpTest(BaseHttpTest):
             self.client.get("/foo.Source/1/targets"),
             self.src.get(1).links.targets.serialize())
 
+    def test_get_resource_collection_with_data(self):
+        self.assertResponse(
+            self.client.get("/foo.Source?include=data"),
+            [{"@pk": item.pk, "data": item.serialize()} for item in self.src])
+
+    def test_get_resource_collection_page_with_data(self):
+        self.assertResponse(
+            self.client.get("/foo.Source?limit=1&include=data"),
+            {"items": [{"@pk": 1, "data": self.src.get(1).serialize()}], "next_cursor": "1"})
+
+    def test_get_resource_collection_with_unknown_include(self):
+        self.assertResponse(self.client.get("/foo.Source?include=foo"), status_code=400)
+
+    def test_get_link_to_many_collection_with_data(self):
+        self.assertResponse(
+            self.client.get("/foo.Source/1/targets?include=data"),
+            [{"@target": 1, "data": self.src.get(1).links.targets.get(1).serialize()}])
+
     def test_get_link_to_many_collection_with_filtering(self):
         self.client.get("/foo.Source/1/targets?foo=bar&foo=bar2&wang.wong=3&query_param=Foo")
         self.assertEqual(self.srv.storage.call_log[-1],
@@ -164,22 +276,118 @@ class HttpTest(BaseHttpTest):
         self.assertResponse(self.client.get("/foo.Source/1/the_target/item"), data=2, status_code=200)
 
 
+class PooledServerTest(BaseTest):
+
+    def setUp(self):
+        super(PooledServerTest, self).setUp()
+        self.server = make_server(Application(self.srv), port=0, workers=2)
+        self.url = "http://127.0.0.1:%d" % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        super(PooledServerTest, self).tearDown()
+
+    def test_slow_dal_call_does_not_block_other_requests(self):
+        res = self.srv._resources_py[Source.get_name()]
+        get_data = res.get_data
+        release = threading.Event()
+
+        def _slow_get_data(user, pk):
+            if pk == 1:
+                release.wait(10)
+            return get_data(user, pk)
+
+        res.get_data = _slow_get_data
+        slow = ThreadPool(1)
+        try:
+            slow_response = slow.apply_async(requests.get, (self.url + "/foo.Source/1",))
+            fast_response = requests.get(self.url + "/foo.Source/2", timeout=5)
+            self.assertFalse(slow_response.ready())
+            release.set()
+            self.assertEqual(fast_response.json()["pk"], 2)
+            self.assertEqual(slow_response.get(5).json()["pk"], 1)
+        finally:
+            release.set()
+            slow.close()
+            slow.join()
+
+
+class DictRouterHttpTest(HttpTest):
+
+    router = DictRouter
+
+    def test_not_found(self):
+        self.assertResponse(self.client.get("/foo.Source/1/nonexisting"), status_code=404)
+        self.assertResponse(self.client.get("/foo.Nonexisting"), status_code=404)
+
+    def test_method_not_allowed(self):
+        self.assertResponse(self.client.put("/foo.Source/1"), status_code=405)
+
+    def test_pk_with_suffix(self):
+        self.assertResponse(self.client.get("/foo.Source/1:data"), status_code=404)
+
+
+class StreamingHttpTest(BaseHttpTest):
+
+    def setUp(self):
+        super(StreamingHttpTest, self).setUp()
+        self.client = Client(Application(self.srv, streaming=True), BaseResponse)
+
+    def test_get_resource_collection(self):
+        self.assertResponse(self.client.get("/foo.Source"), [1, 2])
+
+    def test_get_empty_collection(self):
+        self.storage.delete(Source.get_name(), 1)
+        self.storage.delete(Source.get_name(), 2)
+        self.assertResponse(self.client.get("/foo.Source"), [])
+
+    def test_get_link_to_many_collection(self):
+        self.assertResponse(self.client.get("/foo.Source/1/targets"), [1])
+
+    def test_get_ndjson(self):
+        resp = self.client.get("/foo.Source", headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(resp.headers["Content-Type"], "application/x-ndjson")
+        self.assertEqual(resp.data, "1\n2\n")
+
+    def test_chunks(self):
+        with mock.patch("resource_api_http.http.STREAM_CHUNK_SIZE", 1):
+            resp = self.client.get("/foo.Source")
+        self.assertEqual(resp.data, "[1, 2]")
+
+    def test_error_before_streaming(self):
+        self.srv._resources_py[Source.get_name()].can_get_uris = lambda user: False
+        self.assertResponse(self.client.get("/foo.Source"), status_code=403)
+
+    def test_batch_is_not_streamed(self):
+        self.assertResponse(self.client.post("/:batch", data=[{"method": "GET", "url": "/foo.Source"}]),
+                            [{"status": 200, "body": [1, 2]}])
+
+    def test_ndjson_without_streaming_mode(self):
+        client = Client(Application(self.srv), BaseResponse)
+        resp = client.get("/foo.Source/1/targets", headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(resp.data, "1\n")
+
+
 class HttpErrorTest(BaseHttpTest):
 
     def setUp(self):
         super(HttpErrorTest, self).setUp()
 
-        self._url_map = url_map = mock.Mock()
+        self._router = router = mock.Mock()
 
         class CustomApp(Application):
             def __init__(self, service, debug=False):
-                self._url_map = url_map
+                self._router = router
                 self._debug = debug
 
         self.client = Client(CustomApp(self.srv), BaseResponse)
 
     def _check_exception(self, exception_class, data, error_code):
-        self._url_map.bind_to_environ.side_effect = exception_class(data)
+        self._router.match.side_effect = exception_class(data)
         self.assertResponse(
             self.client.get("/URL"),
             data=data,
@@ -207,7 +415,7 @@ class HttpErrorTest(BaseHttpTest):
         self._check_exception(NotImplementedError, "Foo bar", 501)
 
     def test_server_exception(self):
-        self._url_map.bind_to_environ.side_effect = Exception("Foo bar")
+        self._router.match.side_effect = Exception("Foo bar")
         self.assertResponse(
             self.client.get("/URL"),
             data="Server error",
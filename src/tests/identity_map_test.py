@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+"""
+from resource_api.errors import DoesNotExist
+
+from .base_test import BaseTest
+from .sample_app.resources import Source, Target
+
+
+class IdentityMapTest(BaseTest):
+
+    def setUp(self):
+        super(IdentityMapTest, self).setUp()
+        self.entry_point = ep = self.srv.get_entry_point({}, identity_map=True)
+        self.src = ep.get_resource(Source)
+        self.target = ep.get_resource(Target)
+
+    def _calls(self, *names):
+        return [call for call in self.storage.call_log if call[0] in names]
+
+    def test_exists_is_memoized(self):
+        self.src.get(1)
+        self.src.get(1)
+        self.entry_point.get_resource_by_name("foo.Source").get(1)
+        self.assertEqual(self._calls("EXISTS")[-1:], [("EXISTS", Source.get_name(), 1)])
+        self.assertEqual(len(self._calls("EXISTS")), 1)
+
+    def test_data_is_memoized(self):
+        self.storage.set(Source.get_name(), 1, {"nested": {"tags": ["foo"]}})
+        self.src.get(1).data["extra"] = "changed"
+        self.src.get(1).data["nested"]["tags"].append("bar")
+        self.assertEqual(self.src.get(1).data["extra"], "foo")
+        self.assertEqual(self.src.get(1).data["nested"], {"tags": ["foo"]})
+        self.assertEqual(len(self._calls("GET")), 1)
+
+    def test_can_get_data_is_not_memoized(self):
+        calls = []
+        src = self.srv._resources_py[Source.get_name()]
+        src.can_get_data = lambda user, pk, data: calls.append(data) or True
+        self.src.get(1).data
+        self.src.get(1).get_data(["extra"])
+        self.assertEqual(len(calls), 2)
+
+    def test_update_invalidates(self):
+        self.src.get(1).data
+        self.src.get(1).update({"extra": "bar"})
+        self.assertEqual(self.src.get(1).data["extra"], "bar")
+
+    def test_delete_invalidates(self):
+        self.src.get(1).delete()
+        self.assertRaises(DoesNotExist, self.src.get, 1)
+
+    def test_link_changes_invalidate(self):
+        links = self.src.get(1).links
+        self.assertEqual(links.targets.get(1).data["extra"], "foo")
+        links.targets.get(1).update({"extra": "bar"})
+        self.assertEqual(links.targets.get(1).data["extra"], "bar")
+        self.assertEqual(self.target.get(1).links.sources.get(1).data["extra"], "bar")
+        links.targets.get(1).delete()
+        self.assertRaises(DoesNotExist, links.targets.get, 1)
+        links.targets.create({"@target": 1})
+        self.assertEqual(links.targets.get(1).target.pk, 1)
+
+    def test_disabled_by_default(self):
+        ep = self.srv.get_entry_point({})
+        ep.get_resource(Source).get(1)
+        ep.get_resource(Source).get(1)
+        self.assertEqual(len(self._calls("EXISTS")), 2)
+
+    def test_link_create_many_invalidates(self):
+        links = self.src.get(1).links
+        self.assertRaises(DoesNotExist, links.targets.get, 2)
+        links.targets.create_many([{"@target": 2}])
+        self.assertEqual(links.targets.get(2).target.pk, 2)
+        self.assertEqual(self.target.get(2).links.sources.get(1).target.pk, 1)
@@ -0,0 +1,42 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+"""
+import unittest
+
+import isodate
+
+from resource_api import isotime
+
+
+class IsoTimeTest(unittest.TestCase):
+
+    def _assert_same(self, isotime_func, isodate_func, values):
+        for val in values:
+            try:
+                expected = isodate_func(val)
+            except ValueError:
+                self.assertRaises(ValueError, isotime_func, val)
+                continue
+            rval = isotime_func(val)
+            self.assertEqual(rval, expected)
+            self.assertEqual(type(rval), type(expected))
+            self.assertEqual(repr(getattr(rval, "tzinfo", None)), repr(getattr(expected, "tzinfo", None)))
+
+    def test_parse_datetime(self):
+        self._assert_same(isotime.parse_datetime, isodate.parse_datetime, [
+            "2013-09-30T11:32:39", "2013-09-30T11:32:39.984847", "2013-09-30T11:32:39.98", "2013-09-30T11:32:39Z",
+            "2013-09-30T11:32:39.984847+02:30", "2013-09-30T11:32:39-00:00", "2013-09-30T11:32:39.1234567",
+            "2013-09-30T11:32", "20130930T113239", "2013-09-30T11:32:39+0230", "2013-13-30T11:32:39",
+            "2013-09-30 11:32:39", "2013-09-30T11:32:39.", "foo"
+        ])
+
+    def test_parse_date(self):
+        self._assert_same(isotime.parse_date, isodate.parse_date, [
+            "2013-09-30", "20130930", "2013-W40-1", "2013-02-30", "2013-9-30", "foo"
+        ])
+
+    def test_parse_time(self):
+        self._assert_same(isotime.parse_time, isodate.parse_time, [
+            "11:32:39", "11:32:39.984847", "11:32:39Z", "11:32:39.5+01:00", "11:32", "113239", "25:00:00", "foo"
+        ])
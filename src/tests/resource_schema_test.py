@@ -4,6 +4,7 @@ See LICENSE for details
 """
 import unittest
 import json
+import hashlib
 
 from .sample_app.resources import Target, Source
 from .simulators import TestService
@@ -764,3 +765,13 @@ class SchemaTest(unittest.TestCase):
 
         compareDicts(srv.get_schema(), EXPECTED_HUMAN_SCHEMA)
         self.assertEqual(srv.get_schema(), EXPECTED_HUMAN_SCHEMA)
+
+    def test_schema_bytes(self):
+        srv = TestService()
+        srv.register(Target, "foo.Target")
+        srv.register(Source, "bar.Source")
+        srv.setup()
+        schema_bytes = srv.get_schema_bytes()
+        self.assertIs(srv.get_schema_bytes(), schema_bytes)
+        self.assertEqual(json.loads(schema_bytes), EXPECTED_HUMAN_SCHEMA)
+        self.assertEqual(srv.get_schema_etag(), hashlib.sha1(schema_bytes).hexdigest())
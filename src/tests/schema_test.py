@@ -493,6 +493,12 @@ class SchemaTest(unittest.TestCase):
             {"one": 1, "two": "two", "three": "2010-12-01T00:00:00"}
         )
 
+    def test_schema_serialization_of_some_fields(self):
+        class Sample(Schema):
+            one = IntegerField()
+            two = StringField()
+        self.assertEqual(Sample().serialize({"one": 1, "two": "two"}, fields=set(["two", "three"])), {"two": "two"})
+
     def test_schema_serialization_with_extra_data(self):
         class Sample(Schema):
             one = IntegerField()
@@ -504,3 +510,103 @@ class SchemaTest(unittest.TestCase):
             schema.serialize({"one": 1, "two": "two", "three": datetime(2010, 12, 1), "foo": "bar"}),
             {"one": 1, "two": "two", "three": "2010-12-01T00:00:00", "foo": "bar"}
         )
+
+    def test_fields_are_collected_per_class(self):
+        field = StringField(required=True, default="BLA", readonly=True)
+
+        class Base(Schema):
+            one = field
+
+        class Child(Base):
+            two = IntegerField(required=False)
+
+        self.assertIsNot(Base.fields["one"], field)
+        self.assertIsNot(Child.fields["one"], Base.fields["one"])
+        self.assertEqual(set(Child.fields.keys()), set(["one", "two"]))
+        self.assertEqual(Child._required_fields, set(["one"]))
+        self.assertIs(Child().fields, Child().fields)
+
+    def test_find_fields_is_cached(self):
+
+        class Sample(Schema):
+            one = StringField(readonly=True)
+            two = StringField(changeable=False)
+            three = StringField()
+
+        self.assertEqual(Sample().find_fields(readonly=True, changeable=False), set(["one", "two"]))
+        self.assertIs(Sample.find_fields(changeable=False, readonly=True),
+                      Sample.find_fields(readonly=True, changeable=False))
+
+    def test_compiled_deserializer_is_equivalent(self):
+
+        class Sample(Schema):
+            one = IntegerField(min_val=1, max_val=10)
+            two = StringField(regex="^[a-z]+$", max_length=5, default="abc")
+            three = FloatField(required=False, invalid_choices=[1.5])
+            four = BooleanField(required=False)
+            five = StringField(choices=["a", "b"], required=False)
+            six = ListField(IntegerField(), required=False)
+
+        class CompiledSample(Sample):
+            use_compiled_deserializer = True
+
+        inputs = [
+            {"one": 1},
+            {"one": "5", "two": "foo", "three": 2, "four": True, "five": "a", "six": [1, "2"]},
+            {"one": None, "two": None},
+            {"one": 0, "two": "Foo", "three": 1.5, "four": 1, "five": "c", "six": ["x"]},
+            {"one": 11, "two": "foobar", "three": "nan-ish", "four": None},
+            {"one": [], "two": 1, "unknown": 1},
+            {"two": "foo"},
+            "foo"
+        ]
+        for validate_required_constraint in [True, False]:
+            for with_errors in [True, False]:
+                for data in inputs:
+                    results = []
+                    for schema in [Sample(), CompiledSample()]:
+                        try:
+                            results.append(schema.deserialize(data, validate_required_constraint, with_errors))
+                        except ValidationError, e:
+                            results.append(e.message)
+                    self.assertEqual(results[0], results[1])
+
+    def test_compiled_deserializer_with_additional_fields(self):
+
+        class Sample(Schema):
+            one = IntegerField()
+            has_additional_fields = True
+            use_compiled_deserializer = True
+
+        self.assertEqual(Sample().deserialize({"one": "1", "foo": "bar"}), {"one": 1, "foo": "bar"})
+        self.assertIsNotNone(Sample._compiled_deserializer)
+
+    def test_deserialize_many(self):
+
+        class Sample(Schema):
+            one = IntegerField(min_val=1, max_val=10)
+            two = FloatField(choices=[1.5, 2], required=False)
+            three = StringField(default="abc")
+
+        rows = [
+            {"one": "5", "two": 2},
+            {"one": 0, "two": 3},
+            {"one": "foo", "three": None, "four": 1},
+            {"two": None},
+            {"one": [], "two": "1.5"}
+        ]
+        errors = {}
+        expected = []
+        for index, row in enumerate(rows):
+            try:
+                Sample().deserialize(row)
+            except ValidationError, e:
+                errors[index] = dict(e.message)
+            expected.append(Sample().deserialize(row, with_errors=False))
+
+        with self.assertRaises(ValidationError) as context:
+            Sample().deserialize_many(rows)
+        self.assertEqual(context.exception.message, errors)
+        self.assertEqual(Sample().deserialize_many(rows, with_errors=False), expected)
+        self.assertEqual(Sample().deserialize_many(rows[:1]), [{"one": 5, "two": 2.0, "three": "abc"}])
+        self.assertRaises(ValidationError, Sample().deserialize_many, [{"one": 1}, "foo"])
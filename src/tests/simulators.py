@@ -29,6 +29,10 @@ class RamStorage(object):
         self._call_log.append(("GET", namespace, pk))
         return dict(self._items[namespace][pk])
 
+    def get_many(self, namespace, pks):
+        self._call_log.append(("GET_MANY", namespace, list(pks)))
+        return [dict(self._items[namespace][pk]) for pk in pks]
+
     def exists(self, namespace, pk):
         self._call_log.append(("EXISTS", namespace, pk))
         return pk in self._items[namespace]
@@ -37,6 +41,10 @@ class RamStorage(object):
         self._call_log.append(("DELETE", namespace, pk))
         self._items[namespace].pop(pk)
 
+    def delete_all(self, namespace):
+        self._call_log.append(("DELETE_ALL", namespace))
+        self._items[namespace].clear()
+
     def get_keys(self, namespace, params=None):
         self._call_log.append(("GET_KEYS", namespace, params))
         return self._items[namespace].keys()
@@ -115,7 +123,10 @@ class TestLink(Link):
         self.context["storage"].set((pk, self.get_name()), rel_pk, data)
 
     def delete(self, user, pk, rel_pk):
-        self.context["storage"].delete((pk, self.get_name()), rel_pk)
+        if rel_pk is None:
+            self.context["storage"].delete_all((pk, self.get_name()))
+        else:
+            self.context["storage"].delete((pk, self.get_name()), rel_pk)
 
     def get_uris(self, user, pk, params=None):
         return self.context["storage"].get_keys((pk, self.get_name()), params)
@@ -0,0 +1,61 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+"""
+from resource_api.errors import DoesNotExist, AuthorizationError
+
+from .base_test import BaseTest
+from .sample_app.resources import Source, Target
+
+
+class TraversalTest(BaseTest):
+
+    def setUp(self):
+        super(TraversalTest, self).setUp()
+        self.storage.set(Target.get_name(), 3, {"pk": 3, "extra": "bar"})
+        self.src.get(1).links.targets.create({"@target": 3})
+        self.src.get(2).links.targets.create({"@target": 3})
+
+    def test_follow_many(self):
+        traversal = self.entry_point.traverse("foo.Source", [1, 2]).follow("targets")
+        self.assertEqual(traversal.pks, [1, 3])
+        self.assertEqual([item.pk for item in traversal], [1, 3])
+        self.assertEqual(traversal.data(fields=["extra"]), [{"extra": "foo"}, {"extra": "bar"}])
+
+    def test_follow_back(self):
+        traversal = self.entry_point.traverse("foo.Source", [2]).follow("targets").follow("sources")
+        self.assertEqual(sorted(traversal.pks), [1, 2])
+
+    def test_follow_one(self):
+        self.assertEqual(self.entry_point.traverse("foo.Source").follow("the_target").pks, [2])
+
+    def test_follow_uses_bulk_hook(self):
+        calls = []
+        targets = self.srv._resources_py[Source.get_name()].links.targets
+        targets.get_uris_many = lambda user, pks, params=None: calls.append(pks) or [[1], [1]]
+        self.assertEqual(self.entry_point.traverse("foo.Source", [1, 2]).follow("targets").pks, [1])
+        self.assertEqual(calls, [[1, 2]])
+
+    def test_follow_authorizes_once_per_hop(self):
+        calls = []
+        targets = self.srv._resources_py[Source.get_name()].links.targets
+        for hook in ["can_get_uris_many", "can_discover_pairs"]:
+            func = getattr(targets, hook)
+            setattr(targets, hook, lambda user, items, hook=hook, func=func: calls.append((hook, items)) or
+                    func(user, items))
+        self.assertEqual(self.entry_point.traverse("foo.Source", [1, 2]).follow("targets").pks, [1, 3])
+        self.assertEqual(calls, [("can_get_uris_many", [1, 2]), ("can_discover_pairs", [(1, 1), (1, 3), (2, 3)])])
+
+    def test_non_discoverable_targets_are_skipped(self):
+        self.entry_point._user = {"target": {"discover": False}}
+        self.assertEqual(len(self.entry_point.traverse("foo.Source", [1]).follow("targets")), 0)
+
+    def test_not_allowed(self):
+        self.entry_point._user = {"link": {"list": False}}
+        self.assertRaises(AuthorizationError, self.entry_point.traverse("foo.Source", [1]).follow, "targets")
+
+    def test_non_existent_start(self):
+        self.assertRaises(DoesNotExist, self.entry_point.traverse, "foo.Source", [1, 5])
+
+    def test_unknown_link(self):
+        self.assertRaises(DoesNotExist, self.entry_point.traverse("foo.Source", [1]).follow, "foo")
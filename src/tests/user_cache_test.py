@@ -0,0 +1,91 @@
+"""
+Copyright (c) 2014-2015 F-Secure
+See LICENSE for details
+"""
+import unittest
+
+import mock
+
+from resource_api.user_cache import UserCache
+
+from .simulators import TestService
+
+
+class UserCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = UserCache(2, 10, clock=lambda: self.now)
+
+    def test_get_computes_once(self):
+        compute = mock.Mock(return_value="user")
+        self.assertEqual(self.cache.get("a", compute), "user")
+        self.assertEqual(self.cache.get("a", compute), "user")
+        self.assertEqual(compute.call_count, 1)
+
+    def test_expiry(self):
+        self.cache.get("a", lambda: "old")
+        self.now = 10
+        self.assertEqual(self.cache.get("a", lambda: "new"), "new")
+
+    def test_least_recently_used_is_dropped(self):
+        self.cache.get("a", lambda: "a")
+        self.cache.get("b", lambda: "b")
+        self.cache.get("a", lambda: "new a")
+        self.cache.get("c", lambda: "c")
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get("a", lambda: "new a"), "a")
+        self.assertEqual(self.cache.get("b", lambda: "new b"), "new b")
+
+    def test_invalidate(self):
+        self.cache.get("a", lambda: "a")
+        self.cache.get("b", lambda: "b")
+        self.cache.invalidate("a")
+        self.assertEqual(self.cache.get("a", lambda: "new a"), "new a")
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+
+class CachingService(TestService):
+    user_cache_size = 10
+    user_cache_keys = ("Authorization",)
+
+
+class ServiceUserCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.srv = CachingService()
+        self.srv.setup()
+        self.get_user = self.srv._get_user = mock.Mock(side_effect=lambda data: dict(data))
+
+    def test_user_is_cached(self):
+        user = self.srv.get_entry_point({"Authorization": "foo", "Content-Length": 1}).user
+        self.assertIs(self.srv.get_entry_point({"Authorization": "foo", "Content-Length": 2}).user, user)
+        self.assertEqual(self.srv.get_entry_point({"Authorization": "bar"}).user, {"Authorization": "bar"})
+        self.assertEqual(self.get_user.call_count, 2)
+
+    def test_invalidate_user(self):
+        self.srv.get_entry_point({"Authorization": "foo"})
+        self.srv.get_entry_point({"Authorization": "bar"})
+        self.srv.invalidate_user({"Authorization": "foo"})
+        self.srv.get_entry_point({"Authorization": "foo"})
+        self.srv.get_entry_point({"Authorization": "bar"})
+        self.assertEqual(self.get_user.call_count, 3)
+        self.srv.invalidate_user()
+        self.srv.get_entry_point({"Authorization": "bar"})
+        self.assertEqual(self.get_user.call_count, 4)
+
+    def test_all_data_is_used_by_default(self):
+        self.srv.user_cache_keys = None
+        self.srv.get_entry_point({"Authorization": "foo", "Content-Length": 1})
+        self.srv.get_entry_point({"authorization": "foo", "Content-Length": 1})
+        self.srv.get_entry_point({"Authorization": "foo", "Content-Length": 2})
+        self.assertEqual(self.get_user.call_count, 2)
+
+    def test_disabled_by_default(self):
+        srv = TestService()
+        srv._get_user = mock.Mock(return_value={})
+        srv.get_entry_point({})
+        srv.get_entry_point({})
+        self.assertEqual(srv._get_user.call_count, 2)
+        srv.invalidate_user()